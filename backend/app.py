@@ -1,28 +1,23 @@
 import os
-import pandas as pd
 import json
 import logging
-import re
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
-import tempfile
 from datetime import datetime
-from langchain.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
-from langchain_ollama import OllamaLLM
 
 # Import custom modules
-from database import add_descriptions_and_file_entries, update_description_evaluation, \
-    add_uploaded_file, update_file_statistics, get_recent_files, \
-    get_descriptions_by_file, get_description_id, get_description_by_id, \
-    add_description, check_for_processed, get_uploaded_file, \
-    get_file_descriptions_with_results, add_processed_description, \
-    add_file_entries_batch, load_existing_files_to_queue, update_file_processing_status, remove_file,\
-    get_uploaded_file_by_id
-# For testing
-# from dummy_llm import DummyLLM
+from database import add_uploaded_file, get_recent_files, encode_file_cursor, get_file_descriptions_page, \
+    iter_file_descriptions, get_completed_file_by_hash, clone_uploaded_file, load_existing_files_to_queue, \
+    remove_file, get_uploaded_file_by_id
+from job_queue import start_workers, notify_workers
+from evaluator import pipeline_stats, cache_stats, semantic_cache_stats
+from ingest import read_upload_header, upload_size, hash_upload, stored_upload_name, write_upload
+from events import event_broker, format_sse
+from export import iter_csv, iter_gzip, iter_parquet, parquet_available
+from metrics import render as render_metrics
+from tracing import loop_profiler
 
 # Load environment variables
 load_dotenv()
@@ -45,219 +40,139 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-# Create a prompt template for evaluating data descriptions
-initial_prompt = PromptTemplate(
-    input_variables=["description"],
-    template="""You are a data quality evaluator. Your task is to classify data descriptions as 'Pass' or 'Fail' based on best practices for clarity, precision, and consistency.
-    A high-quality ('Pass') data description should:
-    1. Avoid self-referencing or circular definitions.
-    2. Clarify the meaning of outliers using business-specific distinctions.
-    3. Use singular tense unless referring to a naturally plural concept.
-    4. Define what something is, not what it is not.
-    5. Use clear, descriptive sentences to avoid ambiguity.
-    6. Expand uncommon abbreviations at first use.
-    7. Be precise and allow only one interpretation.
-    8. Be self-contained and not rely on references to other fields.
-    9. Optionally include example values to improve clarity and consistency.
-    Evaluate the following description carefully. If it violates any of these principles, label it as 'Fail' Otherwise, label it 'Pass'.
-    {description} 
-    Output only 'Pass' or 'Fail' without any additional text.
-    """
-)
-
-followup_prompt = PromptTemplate(
-    input_variables=["decision", "description"],
-    template="""
-    You are a data quality evaluator. Your task is to justify why a data description is classified as 'Pass' or 'Fail'.
-    A high-quality ('Pass') data description should:
-    1. Avoid self-referencing or circular definitions.
-    2. Clarify the meaning of outliers using business-specific distinctions.
-    3. Use singular tense unless referring to a naturally plural concept.
-    4. Define what something is, not what it is not.
-    5. Use clear, descriptive sentences to avoid ambiguity.
-    6. Expand uncommon abbreviations at first use.
-    7. Be precise and allow only one interpretation.
-    8. Be self-contained and not rely on references to other fields.
-    9. Optionally include example values to improve clarity and consistency.
-    'Pass' means the description passes all the principles listed above.
-    'Fail' means the description fails to meet any of the principles listed above.
-    The following description has been classified as {decision}:
-    {description}
-    Justify the decision with a clear explanation.
-    Output only the reasoning without any additional text.
-    """
-)
-
-parser = StrOutputParser()
-
-phi_llm = OllamaLLM(model=os.getenv('CLASSIFY_MODEL'), temperature=0.0)
-
-deepseek_llm = OllamaLLM(model=os.getenv('REASON_MODEL'))
-
 @app.route('/api/evaluate', methods=['POST'])
 def evaluate_descriptions():
+    """Queue uploaded files for evaluation and return their job ids immediately."""
     if 'files[]' not in request.files:
         return jsonify({"error": "No files provided"}), 400
 
     files = request.files.getlist('files[]')
-    results = []
     file_records = []
 
     for file in files:
+        file_id = None
         try:
-            # Save the file
-            file_path = os.path.join(UPLOAD_FOLDER, file.filename)
-            file.save(file_path)
-            
-            # Read the CSV file
-            df = pd.read_csv(file_path)
+            # Only read the header here; the rows are read by the worker
+            columns = read_upload_header(file)
             
             # Check if the CSV has a 'description' column
-            if 'description' not in df.columns:
+            if 'description' not in columns:
                 file_records.append({
                     "filename": file.filename,
                     "error": "CSV file must contain a 'description' column"
                 })
                 continue
 
-            # Add file record to database
-            file_exists = get_uploaded_file(file.filename)
-            # if file_exists:
-            #     file_records.append({
-            #         "filename": file.filename,
-            #         "error": "File already exists in database"
-            #     })
-            #     continue
+            # Uploads are stored by content, so identical files share one copy on disk
+            content_hash = hash_upload(file)
+            file_size = upload_size(file)
 
-            file_id = add_uploaded_file(file.filename, os.path.getsize(file_path))
-            
-            # Add descriptions to database
-            descriptions = df['description'].tolist()
-            
-            # Get LLM chains
-            initial_chain = initial_prompt | phi_llm | parser
-            followup_chain = followup_prompt | deepseek_llm | parser
-
-            file_results = []
-            pass_count = 0
-            fail_count = 0
-            total_count = len(descriptions)
-
-            # Process each description
-            for idx, description in enumerate(descriptions):
-                # Skip empty descriptions
-                if pd.isna(description) or description.strip() == '':
-                    result = {
-                        "description": description,
-                        "decision": "FAIL",
-                        "reasoning": "Empty description"
-                    }
-                    fail_count += 1
-                    file_results.append(result)
-                    continue
-
-                # Check cache for existing processed description
-                processed, description_id = check_for_processed(description)
-                if processed:
-                    desc_data = get_description_by_id(description_id)
-                    processed_data = get_description_by_id(desc_data.processed_id)
-                    result = {
-                        "description": description,
-                        "decision": "PASS" if processed_data.pass_ else "FAIL",
-                        "reasoning": processed_data.reasoning
-                    }
-                    if result['decision'] == "PASS":
-                        pass_count += 1
-                    else:
-                        fail_count += 1
-                    file_results.append(result)
-                    continue
-
-                # Run the LLM chain
-                initial_decision = initial_chain.invoke({
-                    "description": description,
+            # A file that was already evaluated is answered with a copy of its results
+            previous = get_completed_file_by_hash(content_hash)
+            if previous:
+                file_id = clone_uploaded_file(previous.id, file.filename, file_size)
+                if not file_id:
+                    raise Exception("Failed to add file record")
+                file_records.append({
+                    "filename": file.filename,
+                    "id": file_id,
+                    "status": "completed",
+                    "cloned_from": previous.id
                 })
+                continue
 
-                # Ensure valid decision
-                attempts = 0
-                while ("pass" not in initial_decision.lower() and "fail" not in initial_decision.lower()) and attempts < 3:
-                    initial_decision = initial_chain.invoke({
-                        "description": description,
-                    })
-                    attempts += 1
-
-                # Parse the response
-                decision = "PASS" if "pass" in initial_decision.lower() else "FAIL"
-
-                # Run followup prompt
-                reasoning = followup_chain.invoke({
-                    "decision": decision,
-                    "description": description,
-                })
+            # Store the file completely before it is queued
+            file_path = os.path.join(UPLOAD_FOLDER, stored_upload_name(content_hash))
+            if not os.path.exists(file_path):
+                write_upload(file, file_path)
 
-                # Remove content within <think> and </think>
-                stripped_reasoning = re.sub(r'<think>.*?</think>', '', reasoning, flags=re.DOTALL).strip()
-
-                # Add processed description
-                processed_desc_id = add_processed_description(decision == "PASS", stripped_reasoning)
-                if not processed_desc_id:
-                    raise Exception("Failed to add processed description")
-
-                # Add description and link to processed description
-                desc_id = add_description(description, file_id=file_id, processed_id=processed_desc_id, is_processed=True)
-                if not desc_id:
-                    raise Exception("Failed to add description")
-
-                result = {
-                    "description": description,
-                    "decision": decision,
-                    "reasoning": stripped_reasoning
-                }
-                
-                if decision == "PASS":
-                    pass_count += 1
-                else:
-                    fail_count += 1
-                
-                file_results.append(result)
-
-            # Update file statistics
-            update_file_statistics(file_id, total_count, pass_count)
-            
-            # Update processing status
-            update_file_processing_status(file_id, "completed")
+            # Add file record to database, which queues it as 'waiting'
+            file_id = add_uploaded_file(file.filename, file_size, content_hash)
+            if not file_id:
+                raise Exception("Failed to add file record")
+            notify_workers()
 
             file_records.append({
                 "filename": file.filename,
                 "id": file_id,
-                "count": total_count,
-                "pass_count": pass_count,
-                "fail_count": fail_count,
-                "pass_rate": (pass_count / total_count) * 100 if total_count > 0 else 0
+                "status": "waiting"
             })
             
-            results.extend(file_results)
-            
         except Exception as e:
-            logger.error(f"Error processing file {file.filename}: {str(e)}")
+            logger.error(f"Error queuing file {file.filename}: {str(e)}")
             file_records.append({
                 "filename": file.filename,
                 "error": f"Error processing file: {str(e)}"
             })
             # Remove the file if it was created
             if file_id:
-                remove_file(file_id)
+                remove_file(file_id, UPLOAD_FOLDER)
             continue
 
-    if not results:
+    if not any('id' in record for record in file_records):
         return jsonify({"error": "No valid files were processed", "file_records": file_records}), 400
 
+    notify_workers()
+
     return jsonify({
         "files": file_records,
-        "total_results": len(results),
-        "pass_count": sum(1 for r in results if r['decision'] == 'PASS'),
-        "fail_count": sum(1 for r in results if r['decision'] == 'FAIL')
-    })
+        "results": []
+    }), 202
+
+@app.route('/api/queue', methods=['GET'])
+def get_queue():
+    """Get the files that are waiting for or undergoing evaluation."""
+    return jsonify({"queue": load_existing_files_to_queue()}), 200
+
+@app.route('/api/events', methods=['GET'])
+def stream_events():
+    """Stream file progress as Server-Sent Events.
+
+    Emits 'status' and 'progress' events with the same fields as /api/queue
+    items, and 'deleted' events. With ?file_id= only that file's events are
+    sent, plus 'rows' events carrying its evaluated rows as they are stored
+    (rows are only published while a stream of the file is open).
+    A reconnecting client resumes after its Last-Event-ID header (or
+    ?last_event_id=); if those events are gone it gets a 'reset' event and
+    should reload from /api/queue, or the file's descriptions.
+    """
+    file_id = request.args.get('file_id', type=int)
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({"error": "Invalid last event id"}), 400
+
+    def generate():
+        for event in event_broker.subscribe(last_id=last_event_id, file_id=file_id):
+            yield format_sse(event)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/pipeline', methods=['GET'])
+def get_pipeline():
+    """Get queue depth and throughput of the classify and reason stages."""
+    return jsonify({
+        "stages": pipeline_stats(),
+        "cache": cache_stats(),
+        "semantic_cache": semantic_cache_stats()
+    }), 200
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Expose stage timings, cache and retry counters and queue gauges to Prometheus."""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/profile', methods=['POST'])
+def request_profile():
+    """Profile the evaluation loop of the next files to be evaluated (?files=N, default 1)."""
+    files = max(1, min(request.args.get('files', 1, type=int), 100))
+    pending = loop_profiler.request(files)
+    return jsonify({"pending_profiles": pending, "directory": loop_profiler.directory}), 202
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -265,53 +180,89 @@ def health_check():
 
 @app.route('/api/files', methods=['GET'])
 def get_files():
-    """Get a list of recently uploaded files."""
-    files = get_recent_files(limit=20)
-    return jsonify({"files": files}), 200
+    """Get a page of recently uploaded files.
+
+    Pass the returned next_cursor as ?cursor= to get the following page.
+    """
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    try:
+        files = get_recent_files(limit=limit, cursor=request.args.get('cursor'))
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    next_cursor = encode_file_cursor(files[-1]) if len(files) == limit else None
+    return jsonify({"files": files, "next_cursor": next_cursor}), 200
 
 @app.route('/api/files/<int:file_id>/descriptions', methods=['GET'])
 def get_file_descriptions(file_id):
-    """Get all descriptions from a specific file."""
+    """Get a page of the descriptions from a specific file.
+
+    Query parameters: limit (at most 1000), cursor (the next_cursor of the
+    previous page), decision (PASS or FAIL), search (substring of the
+    description) and reasoning=false to leave the reasoning out.
+    """
+    limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+    include_reasoning = request.args.get('reasoning', 'true').lower() not in ('0', 'false', 'no')
     try:
-        result = get_descriptions_by_file(file_id)
-        if not result or not result.get('file'):
+        result = get_file_descriptions_page(
+            file_id,
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            decision=request.args.get('decision'),
+            search=request.args.get('search'),
+            include_reasoning=include_reasoning
+        )
+        if not result:
             return jsonify({"error": "File not found or no descriptions available"}), 404
-            
-        return jsonify({
-            "file": result["file"],
-            "descriptions": result["descriptions"] or []
-        }), 200
+
+        return jsonify(result), 200
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query: {e}"}), 400
     except Exception as e:
         logger.error(f"Error getting file descriptions: {e}")
         return jsonify({"error": "Failed to fetch descriptions"}), 500
 
+def export_results(file_id, name):
+    """Stream the evaluated rows of a file as a download.
+
+    Rows are read from a database cursor and serialized chunk by chunk, so
+    memory use does not depend on the size of the file. ?format=parquet
+    returns Parquet (requires pyarrow); CSV can be gzipped with ?compression=gzip.
+    """
+    if not get_uploaded_file_by_id(file_id):
+        return jsonify({"error": "File not found"}), 404
+
+    export_format = request.args.get('format', 'csv').lower()
+    compression = request.args.get('compression', '').lower()
+    rows = iter_file_descriptions(file_id)
+
+    if export_format == 'parquet':
+        if not parquet_available():
+            return jsonify({"error": "Parquet export requires pyarrow"}), 400
+        body, mimetype, download_name = iter_parquet(rows), 'application/vnd.apache.parquet', f'{name}.parquet'
+    elif export_format == 'csv':
+        body, mimetype, download_name = iter_csv(rows), 'text/csv', f'{name}.csv'
+        if compression == 'gzip':
+            body, mimetype, download_name = iter_gzip(body), 'application/gzip', f'{download_name}.gz'
+    else:
+        return jsonify({"error": "Unsupported format"}), 400
+
+    return Response(
+        body,
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={download_name}'}
+    )
+
 @app.route('/api/download/<int:file_id>', methods=['GET'])
 def download_results(file_id):
-    """Generate and download results for a specific file."""
-    descriptions = get_descriptions_by_file(file_id)
-    
-    if not descriptions:
-        return jsonify({"error": "File not found or no descriptions available"}), 404
-    
-    # Convert to DataFrame
-    df = pd.DataFrame(descriptions)
-    
-    # Create a temporary file
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.csv')
-    df.to_csv(temp_file.name, index=False)
-    
-    return send_file(
-        temp_file.name,
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'evaluation_results_{file_id}.csv'
-    )
+    """Download the evaluation results for a specific file."""
+    return export_results(file_id, f'evaluation_results_{file_id}')
 
 @app.route('/api/files/<int:file_id>', methods=['DELETE'])
 def delete_file(file_id):
     """Delete a file and its associated descriptions."""
     try:
-        success = remove_file(file_id)
+        success = remove_file(file_id, UPLOAD_FOLDER)
         if not success:
             return jsonify({"error": "File not found"}), 404
         return jsonify({"message": "File deleted successfully"}), 200
@@ -328,7 +279,7 @@ def download_file(file_id):
             return jsonify({"error": "File not found"}), 404
 
         # Get the file path
-        file_path = os.path.join(UPLOAD_FOLDER, file.fname)
+        file_path = os.path.join(UPLOAD_FOLDER, file.stored_name())
         if not os.path.exists(file_path):
             return jsonify({"error": "File not found on disk"}), 404
 
@@ -345,26 +296,22 @@ def download_file(file_id):
 def download_descriptions(file_id):
     """Download the processed descriptions for a file."""
     try:
-        descriptions = get_descriptions_by_file(file_id)
-        if not descriptions or not descriptions.get('descriptions'):
-            return jsonify({"error": "No descriptions found"}), 404
-
-        # Create a DataFrame with the descriptions
-        df = pd.DataFrame(descriptions['descriptions'])
-        
-        # Create a temporary file
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.csv')
-        df.to_csv(temp_file.name, index=False)
-        
-        return send_file(
-            temp_file.name,
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'processed_descriptions_{file_id}.csv'
-        )
+        return export_results(file_id, f'processed_descriptions_{file_id}')
     except Exception as e:
         logger.error(f"Error downloading descriptions: {e}")
         return jsonify({"error": "Failed to download descriptions"}), 500
 
+@app.before_request
+def ensure_workers():
+    """Start the evaluation workers in the process that serves requests.
+
+    This covers `flask run` and WSGI servers as well as `python app.py`, and
+    skips the debug reloader's parent process, which never serves a request.
+    """
+    start_workers(UPLOAD_FOLDER)
+
 if __name__ == '__main__':
+    # In the reloader's serving child, resume the queue without waiting for a first request
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_workers(UPLOAD_FOLDER)
     app.run(debug=True, host='0.0.0.0', port=5005)
\ No newline at end of file
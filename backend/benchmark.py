@@ -0,0 +1,257 @@
+"""Offline benchmark of the evaluation pipeline.
+
+Runs files of synthetic descriptions through the classify and reason stages
+and the database writer, with the deterministic DummyLLM in place of the
+Ollama models, and reports throughput, per-row latency, database queries
+and peak memory. Every scenario runs in its own process against a new
+SQLite database, so results do not depend on what ran before.
+
+Usage:
+    python benchmark.py run --rows 100k --scenarios cold,warm,mixed --latency 0.01
+    python benchmark.py generate --rows 1M --duplicate-ratio 0.3 descriptions.csv
+"""
+import os
+import sys
+import csv
+import json
+import time
+import queue
+import random
+import argparse
+import tempfile
+import resource
+import multiprocessing
+
+ROW_PRESETS = {'1k': 1000, '100k': 100000, '1M': 1000000}
+SCENARIOS = ('cold', 'warm', 'mixed')
+
+_SUBJECTS = ['customer', 'order', 'invoice', 'shipment', 'product', 'account', 'payment', 'employee',
+             'supplier', 'contract', 'warehouse', 'transaction', 'campaign', 'subscription', 'claim']
+_ATTRIBUTES = ['identifier', 'creation date', 'status code', 'total amount', 'region', 'category',
+               'currency', 'priority', 'owner', 'last update timestamp', 'discount rate', 'channel']
+_DETAILS = ['in US dollars', 'as an ISO 8601 date', 'assigned by the billing system', 'e.g. 42 or 7',
+            'one of OPEN, CLOSED or PENDING', 'unique per record', 'see other field', 'N/A',
+            'excluding tax', 'as reported by the source system', 'rounded to two decimals', '']
+
+
+def synthetic_description(index, seed=0):
+    """Build the index-th synthetic description; the same arguments always give the same text."""
+    rng = random.Random(f"{seed}:{index}")
+    text = f"The {rng.choice(_ATTRIBUTES)} of the {rng.choice(_SUBJECTS)}"
+    detail = rng.choice(_DETAILS)
+    if detail:
+        text += f", {detail}"
+    # The index keeps every description distinct
+    return f"{text} (field {index})."
+
+
+def generate_rows(rows, duplicate_ratio=0.5, seed=0, offset=0, order_seed=None):
+    """Generate the descriptions of a synthetic file.
+
+    Args:
+        rows (int): Number of rows
+        duplicate_ratio (float): Fraction of rows repeating an earlier description
+        seed (int): Seed of the description texts
+        offset (int): Index of the first distinct description, to build files
+            that share none or part of their descriptions
+        order_seed (int): Seed of the row order; defaults to seed
+
+    Returns:
+        list: The descriptions, in file order
+    """
+    distinct = max(1, round(rows * (1 - duplicate_ratio)))
+    pool = [synthetic_description(offset + i, seed) for i in range(distinct)]
+    rng = random.Random(seed if order_seed is None else order_seed)
+    descriptions = pool + [rng.choice(pool) for _ in range(rows - distinct)]
+    rng.shuffle(descriptions)
+    return descriptions
+
+
+def write_csv(path, descriptions):
+    """Write descriptions as an upload CSV with a description column."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['column_name', 'description'])
+        for i, description in enumerate(descriptions):
+            writer.writerow([f'col_{i}', description])
+
+
+def generate_csv(path, rows, duplicate_ratio=0.5, seed=0, offset=0, order_seed=None):
+    """Write a synthetic upload CSV; see generate_rows for the arguments."""
+    write_csv(path, generate_rows(rows, duplicate_ratio, seed, offset, order_seed))
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def _scenario_files(scenario, rows, duplicate_ratio, seed, workdir):
+    """Write the files of a scenario.
+
+    Returns:
+        tuple: (setup_paths, measured_path). The setup files are evaluated
+        first, unmeasured, to warm the caches
+    """
+    measured = os.path.join(workdir, 'measured.csv')
+    if scenario == 'cold':
+        generate_csv(measured, rows, duplicate_ratio, seed)
+        return [], measured
+
+    setup = os.path.join(workdir, 'setup.csv')
+    if scenario == 'warm':
+        # Same descriptions in another order, so the upload itself is not identical
+        generate_csv(setup, rows, duplicate_ratio, seed)
+        generate_csv(measured, rows, duplicate_ratio, seed, order_seed=seed + 1)
+    elif scenario == 'mixed':
+        # The setup file holds the first half of the measured file's distinct descriptions
+        generate_csv(setup, max(1, rows // 2), duplicate_ratio, seed)
+        generate_csv(measured, rows, duplicate_ratio, seed, order_seed=seed + 1)
+    else:
+        raise ValueError(f"Unknown scenario: {scenario}")
+    return [setup], measured
+
+
+def _run_scenario(scenario, options, workdir, setup_paths, measured_path, results):
+    """Run one scenario in this (fresh) process and put its report on the results queue.
+
+    The scenario's files are written beforehand by the parent process, so
+    generating them does not count towards this process's peak memory.
+    """
+    os.chdir(workdir)
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'benchmark.db')}",
+        'LLM_BACKEND': 'dummy',
+        'SEMANTIC_CACHE_ENABLED': 'false',
+        'DUMMY_LLM_SEED': str(options['seed']),
+        'DUMMY_LLM_LATENCY': str(options['latency']),
+        'DUMMY_LLM_JITTER': str(options['jitter']),
+    })
+
+    from sqlalchemy import event
+    import database
+    import evaluator
+
+    for path in setup_paths:
+        file_id = database.add_uploaded_file(os.path.basename(path), os.path.getsize(path))
+        evaluator.evaluate_file(file_id, path)
+
+    queries = [0]
+    event.listen(database.engine, 'before_cursor_execute', lambda *args: queries.__setitem__(0, queries[0] + 1))
+    calls_before = {stage['name']: stage['completed_items'] for stage in evaluator.pipeline_stats()}
+
+    # A row's latency runs from when the pipeline reads it until its evaluation
+    # is handed to the writer, in input order
+    latencies = []
+    file_id = database.add_uploaded_file('measured.csv', os.path.getsize(measured_path))
+    started = time.perf_counter()
+    if not evaluator.evaluate_file(file_id, measured_path, on_row=lambda row, latency: latencies.append(latency)):
+        raise RuntimeError(f"Evaluating {measured_path} failed")
+    elapsed = time.perf_counter() - started
+
+    calls = {stage['name']: stage['completed_items'] - calls_before[stage['name']]
+             for stage in evaluator.pipeline_stats()}
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak_rss //= 1024  # Reported in bytes on macOS, kilobytes elsewhere
+
+    results.put({
+        'scenario': scenario,
+        'rows': len(latencies),
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'db_queries': queries[0],
+        'classified': calls.get('classify', 0),
+        'reasoned': calls.get('reason', 0),
+        'cache_hit_rate': round(evaluator.cache_stats()['hit_rate'], 3),
+        'peak_rss_mb': round(peak_rss / 1024, 1)
+    })
+
+
+def run_benchmark(scenarios, rows, duplicate_ratio=0.5, seed=0, latency=0.0, jitter=0.0):
+    """Run the scenarios one after another, each in a new process.
+
+    Returns:
+        list: One report dict per scenario
+    """
+    options = {'rows': rows, 'duplicate_ratio': duplicate_ratio, 'seed': seed,
+               'latency': latency, 'jitter': jitter}
+    context = multiprocessing.get_context('spawn')
+    reports = []
+    for scenario in scenarios:
+        workdir = tempfile.mkdtemp(prefix=f'benchmark-{scenario}-')
+        setup_paths, measured_path = _scenario_files(scenario, rows, duplicate_ratio, seed, workdir)
+        results = context.Queue()
+        process = context.Process(target=_run_scenario,
+                                  args=(scenario, options, workdir, setup_paths, measured_path, results))
+        process.start()
+        while True:
+            try:
+                report = results.get(timeout=1)
+                break
+            except queue.Empty:
+                if not process.is_alive():
+                    raise RuntimeError(f"Scenario {scenario} exited with code {process.exitcode}")
+        process.join()
+        reports.append(report)
+    return reports
+
+
+def _parse_rows(value):
+    return ROW_PRESETS[value] if value in ROW_PRESETS else int(value)
+
+
+def _print_reports(reports):
+    columns = ['scenario', 'rows', 'seconds', 'rows_per_second', 'p50_ms', 'p99_ms', 'db_queries',
+               'classified', 'reasoned', 'cache_hit_rate', 'peak_rss_mb']
+    widths = [max(len(column), *(len(str(report[column])) for report in reports)) for column in columns]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for report in reports:
+        print("  ".join(str(report[column]).ljust(width) for column, width in zip(columns, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the evaluation pipeline")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Run benchmark scenarios")
+    run.add_argument('--rows', type=_parse_rows, default=ROW_PRESETS['1k'],
+                     help="Rows per file: 1k, 100k, 1M or a number")
+    run.add_argument('--scenarios', default=','.join(SCENARIOS),
+                     help="Comma-separated scenarios: cold, warm, mixed")
+    run.add_argument('--duplicate-ratio', type=float, default=0.5)
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--latency', type=float, default=0.0, help="Mean seconds per model call")
+    run.add_argument('--jitter', type=float, default=0.0, help="Standard deviation of the call latency")
+    run.add_argument('--json', help="Also write the reports to this file")
+
+    generate = commands.add_parser('generate', help="Write a synthetic upload CSV")
+    generate.add_argument('path')
+    generate.add_argument('--rows', type=_parse_rows, default=ROW_PRESETS['1k'])
+    generate.add_argument('--duplicate-ratio', type=float, default=0.5)
+    generate.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args(argv)
+    if args.command == 'generate':
+        generate_csv(args.path, args.rows, args.duplicate_ratio, args.seed)
+        return
+
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(',') if scenario.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    reports = run_benchmark(scenarios, args.rows, args.duplicate_ratio, args.seed, args.latency, args.jitter)
+    _print_reports(reports)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
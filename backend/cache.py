@@ -0,0 +1,123 @@
+import os
+import re
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# Maximum number of evaluations kept in memory and how long each stays valid
+RESULT_CACHE_SIZE = int(os.getenv('RESULT_CACHE_SIZE', '10000'))
+RESULT_CACHE_TTL = float(os.getenv('RESULT_CACHE_TTL', '3600'))
+
+
+_TRAILING_PUNCTUATION = re.compile(r'[\s.,;:!?]+$')
+
+# Normalization steps that can be combined into a cache key pipeline
+NORMALIZATION_STEPS = {
+    'nfc': lambda text: unicodedata.normalize('NFC', text),
+    'whitespace': lambda text: ' '.join(text.split()),
+    'casefold': lambda text: text.casefold(),
+    'punctuation': lambda text: _TRAILING_PUNCTUATION.sub('', text),
+}
+
+# Comma-separated steps applied, in order, to build cache keys
+CACHE_NORMALIZATION = [step.strip() for step in os.getenv('CACHE_NORMALIZATION', 'nfc,whitespace,casefold,punctuation').split(',')
+                       if step.strip()]
+
+for _step in CACHE_NORMALIZATION:
+    if _step not in NORMALIZATION_STEPS:
+        raise ValueError(f"Unknown cache normalization step '{_step}', expected one of {', '.join(NORMALIZATION_STEPS)}")
+
+
+def normalize_description(description_text, steps=None):
+    """Normalize a description for use as a cache key.
+
+    Descriptions that normalize to the same text share one evaluation; the
+    original text is never replaced by its normalized form.
+
+    Args:
+        description_text (str): The description as uploaded
+        steps (list of str): Normalization steps to apply, defaults to CACHE_NORMALIZATION
+    """
+    text = description_text.strip()
+    for step in CACHE_NORMALIZATION if steps is None else steps:
+        text = NORMALIZATION_STEPS[step](text)
+    return text
+
+
+def model_identity():
+    """Identify the models whose output is cached, so switching models misses the cache."""
+    return f"{os.getenv('CLASSIFY_MODEL')}|{os.getenv('REASON_MODEL')}"
+
+
+class ResultCache:
+    """Thread-safe LRU cache of evaluation results with a time-to-live.
+
+    Entries are keyed on the normalized description text and the model identity.
+    """
+
+    def __init__(self, maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _key(self, description_text):
+        return normalize_description(description_text), model_identity()
+
+    def get(self, description_text):
+        """Get the cached result of a description, or None."""
+        key = self._key(description_text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, description_text, value):
+        """Cache the result of a description, evicting the least recently used entries."""
+        if self.maxsize <= 0:
+            return
+        key = self._key(description_text)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, description_texts):
+        """Drop the cached results of the given descriptions."""
+        with self._lock:
+            for description_text in description_texts:
+                self._entries.pop(self._key(description_text), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Get the size and hit/miss counters of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+result_cache = ResultCache()
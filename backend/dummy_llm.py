@@ -1,59 +1,147 @@
-from langchain.llms.base import LLM
-from typing import Any, List, Mapping, Optional
+import os
+import re
+import json
+import time
 import random
+import hashlib
+from typing import Any, Iterator, List, Mapping, Optional
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk, LLMResult
+
+# Defaults of the fake model, used by LLM_BACKEND=dummy and the benchmark
+DUMMY_LLM_SEED = int(os.getenv('DUMMY_LLM_SEED', '0'))
+DUMMY_LLM_LATENCY = float(os.getenv('DUMMY_LLM_LATENCY', '0.05'))
+DUMMY_LLM_JITTER = float(os.getenv('DUMMY_LLM_JITTER', '0.01'))
+DUMMY_LLM_PASS_RATE = float(os.getenv('DUMMY_LLM_PASS_RATE', '0.5'))
+
+# Pieces of the evaluator prompts that surround the descriptions
+_CRITERIA_END = "Otherwise, label it 'Pass'."
+_BATCH_LINE = re.compile(r'^\s*(\d+)\.\s(.*)$', re.MULTILINE)
+_FOLLOWUP = re.compile(r"has been classified as (PASS|FAIL):\s*(.*?)\s*Justify the decision", re.DOTALL)
+_TOKEN = re.compile(r'\S+\s*|\s+')
+
+REASONING_TEMPLATES = {
+    "PASS": [
+        "The description is clear and provides sufficient context. It uses {words} words to state what the data represents.",
+        "This description meets quality standards. It provides adequate information about what the data represents and how it is used.",
+        "The description is well-formed and contains necessary information. It has sufficient length ({length} characters) and specific terminology."
+    ],
+    "FAIL": [
+        "The description lacks clarity and sufficient detail. With only {words} words it needs more specific information about the data's purpose and context.",
+        "This description is too vague and doesn't provide enough context for users to understand the data. It's missing important details about format, units, or business relevance.",
+        "The description is inadequate. It's too short ({length} characters) or uses generic terms that don't convey meaningful information about what the data represents."
+    ]
+}
+
 
 class DummyLLM(LLM):
     """
-    A dummy LLM implementation for demonstration purposes.
-    This simulates responses for data description quality evaluation.
+    A deterministic stand-in for the Ollama models, for offline runs and benchmarks.
+    It answers the classify, batch classify and reasoning prompts of the evaluator.
+
+    The decision for a description depends only on the seed and its text, so
+    repeated runs give identical results. Each call sleeps for a latency drawn
+    from a normal distribution (latency, jitter), also seeded by the prompt.
     """
-    
+
+    seed: int = DUMMY_LLM_SEED
+    latency: float = DUMMY_LLM_LATENCY
+    jitter: float = DUMMY_LLM_JITTER
+    pass_rate: float = DUMMY_LLM_PASS_RATE
+    # Put a <think> block before the reasoning, like reasoning models do, unless called with think=False
+    think: bool = False
+
     @property
     def _llm_type(self) -> str:
         return "dummy_llm"
 
-    def _call(self, prompt: str, stop: Optional[List[str]] = None) -> str:
-        """
-        Generate a dummy response based on the input prompt.
-        Analyzes the description and returns a simulated evaluation.
-        """
-        # Extract the description from the prompt
-        try:
-            description = prompt.split('"{description}"')[1].split('Provide your evaluation')[0].strip()
-            description = description.lower()
-        except:
-            description = prompt.lower()
-    
-        # Determine if the description is good based on indicators and length
-        is_good = random.choice([0, 1])
-        
-        # Generate reasoning based on the decision
-        if is_good:
-            decision = "PASS"
-            reasoning_options = [
-                f"The description is clear and provides sufficient context. It includes {good_count} quality indicators such as specific details about the data's purpose, format, or business context.",
-                f"This description meets quality standards. It provides adequate information about what the data represents and includes important details that help users understand its meaning and usage.",
-                f"The description is well-formed and contains necessary information. It has sufficient length ({len(description)} characters) and includes specific terminology that clarifies its purpose."
-            ]
-        else:
-            decision = "FAIL"
-            reasoning_options = [
-                f"The description lacks clarity and sufficient detail. It only has {good_count} quality indicators but {bad_count} poor quality indicators. It needs more specific information about the data's purpose and context.",
-                f"This description is too vague and doesn't provide enough context for users to understand the data. It's missing important details about format, units, or business relevance.",
-                f"The description is inadequate. It's too short ({len(description)} characters) or uses generic terms that don't convey meaningful information about what the data represents."
-            ]
-        
-        # Randomly select a reasoning
-        reasoning = random.choice(reasoning_options)
-        
-        # Format the response
-        response = f"""
-Decision: {decision}
-Reasoning: {reasoning}
-"""
+    def _fraction(self, *parts) -> float:
+        """Deterministic number in [0, 1) derived from the seed and parts."""
+        digest = hashlib.sha256("\x00".join([str(self.seed), *map(str, parts)]).encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+    def decide(self, description: str) -> str:
+        """The decision this model gives for a description."""
+        return "PASS" if self._fraction('decision', description.strip()) < self.pass_rate else "FAIL"
+
+    def _sleep(self, prompt: str) -> None:
+        rng = random.Random(self._fraction('latency', prompt))
+        delay = rng.gauss(self.latency, self.jitter) if self.jitter else self.latency
+        if delay > 0:
+            time.sleep(delay)
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None,
+              **kwargs: Any) -> str:
+        """
+        Generate a response to one of the evaluator prompts.
+        """
+        self._sleep(prompt)
+        response = self._respond(prompt, kwargs.get("format"), kwargs.get("think"))
+        if run_manager:
+            run_manager.on_llm_new_token(response)
         return response
 
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None,
+                **kwargs: Any) -> Iterator[GenerationChunk]:
+        """
+        Stream the response one word at a time, after the call latency.
+        """
+        self._sleep(prompt)
+        tokens = _TOKEN.findall(self._respond(prompt, kwargs.get("format"), kwargs.get("think")))
+        for i, token in enumerate(tokens):
+            info = None
+            if i == len(tokens) - 1:
+                info = {"model": self._llm_type, "prompt_eval_count": len(prompt.split()), "eval_count": len(tokens)}
+            chunk = GenerationChunk(text=token, generation_info=info)
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    def _respond(self, prompt: str, output_format: Any = None, think: Optional[bool] = None) -> str:
+        followup = _FOLLOWUP.search(prompt)
+        if followup:
+            decision, description = followup.groups()
+            templates = REASONING_TEMPLATES[decision]
+            template = templates[int(self._fraction('reasoning', description) * len(templates))]
+            reasoning = template.format(words=len(description.split()), length=len(description))
+            if self.think and think is not False:
+                reasoning = f"<think>Checking the description against each principle.</think>\n{reasoning}"
+            return reasoning
+
+        body = prompt.split(_CRITERIA_END, 1)[-1]
+        if "numbered descriptions" in prompt:
+            lines = _BATCH_LINE.findall(body.split("Output exactly", 1)[0])
+            return "\n".join(f"{number}. {self.decide(description).capitalize()}" for number, description in lines)
+
+        description = body.split("Output only", 1)[0]
+        decision = self.decide(description).capitalize()
+        if isinstance(output_format, dict):
+            # Answer in the shape of the requested JSON schema, like Ollama's structured outputs
+            return json.dumps({next(iter(output_format.get("properties", {"decision": None}))): decision})
+        return decision
+
+    def _generate(self, prompts: List[str], stop: Optional[List[str]] = None, run_manager: Any = None,
+                  **kwargs: Any) -> LLMResult:
+        """
+        Generate like the base LLM, adding the token counts Ollama reports (counted in words here).
+        """
+        result = super()._generate(prompts, stop=stop, run_manager=run_manager, **kwargs)
+        for prompt, generations in zip(prompts, result.generations):
+            for generation in generations:
+                generation.generation_info = {
+                    "model": self._llm_type,
+                    "prompt_eval_count": len(prompt.split()),
+                    "eval_count": len(generation.text.split())
+                }
+        return result
+
+    def get_num_tokens(self, text: str) -> int:
+        """
+        Count tokens the way the token counts above do, in words.
+        """
+        return len(text.split())
+
     @property
     def _identifying_params(self) -> Mapping[str, Any]:
         """Get the identifying parameters."""
-        return {"name": "DummyLLM"}
+        return {"name": "DummyLLM", "seed": self.seed, "pass_rate": self.pass_rate}
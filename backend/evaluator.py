@@ -0,0 +1,662 @@
+import os
+import logging
+import re
+import time
+from collections import deque, namedtuple
+from contextlib import closing
+from itertools import islice
+import pandas as pd
+from langchain.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from dotenv import load_dotenv
+from langchain_ollama import OllamaLLM
+
+from database import update_file_statistics, get_processed_descriptions, \
+    get_processed_descriptions_by_id, update_file_processing_status, begin_file_evaluation, \
+    DescriptionWriter, FileRemovedError
+from pipeline import Stage
+from ingest import iter_descriptions, estimate_total_rows, INGEST_CHUNK_SIZE
+from cache import result_cache, normalize_description
+from semantic_cache import semantic_cache
+from metrics import Gauge, StageTimings, stage_timer, stage_seconds, cache_lookups, llm_retries, \
+    malformed_decisions, rows_evaluated, reasoning_tokens, reasoning_truncated
+from tracing import llm_tracer, loop_profiler
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Create a prompt template for evaluating data descriptions
+initial_prompt = PromptTemplate(
+    input_variables=["description"],
+    template="""You are a data quality evaluator. Your task is to classify data descriptions as 'Pass' or 'Fail' based on best practices for clarity, precision, and consistency.
+    A high-quality ('Pass') data description should:
+    1. Avoid self-referencing or circular definitions.
+    2. Clarify the meaning of outliers using business-specific distinctions.
+    3. Use singular tense unless referring to a naturally plural concept.
+    4. Define what something is, not what it is not.
+    5. Use clear, descriptive sentences to avoid ambiguity.
+    6. Expand uncommon abbreviations at first use.
+    7. Be precise and allow only one interpretation.
+    8. Be self-contained and not rely on references to other fields.
+    9. Optionally include example values to improve clarity and consistency.
+    Evaluate the following description carefully. If it violates any of these principles, label it as 'Fail' Otherwise, label it 'Pass'.
+    {description} 
+    Output only 'Pass' or 'Fail' without any additional text.
+    """
+)
+
+followup_prompt = PromptTemplate(
+    input_variables=["decision", "description"],
+    template="""
+    You are a data quality evaluator. Your task is to justify why a data description is classified as 'Pass' or 'Fail'.
+    A high-quality ('Pass') data description should:
+    1. Avoid self-referencing or circular definitions.
+    2. Clarify the meaning of outliers using business-specific distinctions.
+    3. Use singular tense unless referring to a naturally plural concept.
+    4. Define what something is, not what it is not.
+    5. Use clear, descriptive sentences to avoid ambiguity.
+    6. Expand uncommon abbreviations at first use.
+    7. Be precise and allow only one interpretation.
+    8. Be self-contained and not rely on references to other fields.
+    9. Optionally include example values to improve clarity and consistency.
+    'Pass' means the description passes all the principles listed above.
+    'Fail' means the description fails to meet any of the principles listed above.
+    The following description has been classified as {decision}:
+    {description}
+    Justify the decision with a clear explanation.
+    Output only the reasoning without any additional text.
+    """
+)
+
+batch_initial_prompt = PromptTemplate(
+    input_variables=["count", "descriptions"],
+    template="""You are a data quality evaluator. Your task is to classify data descriptions as 'Pass' or 'Fail' based on best practices for clarity, precision, and consistency.
+    A high-quality ('Pass') data description should:
+    1. Avoid self-referencing or circular definitions.
+    2. Clarify the meaning of outliers using business-specific distinctions.
+    3. Use singular tense unless referring to a naturally plural concept.
+    4. Define what something is, not what it is not.
+    5. Use clear, descriptive sentences to avoid ambiguity.
+    6. Expand uncommon abbreviations at first use.
+    7. Be precise and allow only one interpretation.
+    8. Be self-contained and not rely on references to other fields.
+    9. Optionally include example values to improve clarity and consistency.
+    Evaluate each of the following {count} numbered descriptions carefully and independently. If a description violates any of these principles, label it as 'Fail' Otherwise, label it 'Pass'.
+    {descriptions}
+    Output exactly one line per description in the form '<number>. Pass' or '<number>. Fail' without any additional text.
+    """
+)
+
+parser = StrOutputParser()
+
+# 'dummy' replaces both models with the deterministic DummyLLM, for offline runs and benchmarks
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'ollama')
+
+# Constrain single classify calls to a JSON decision (Ollama structured outputs, 0.5 or later),
+# so the answer always holds a decision, and cap the tokens the model may generate for it
+CLASSIFY_CONSTRAINED_OUTPUT = os.getenv('CLASSIFY_CONSTRAINED_OUTPUT', 'true').lower() == 'true'
+CLASSIFY_NUM_PREDICT = int(os.getenv('CLASSIFY_NUM_PREDICT', '16'))
+
+# Most tokens the reasoning model may generate per row, hidden thoughts included (0 for no limit)
+REASON_MAX_TOKENS = int(os.getenv('REASON_MAX_TOKENS', '0'))
+# 'false' asks Ollama (0.9 or later) not to think before answering, for models that can switch it off
+REASON_THINKING = os.getenv('REASON_THINKING', 'true').lower() == 'true'
+
+DECISION_SCHEMA = {
+    "type": "object",
+    "properties": {"decision": {"type": "string", "enum": ["Pass", "Fail"]}},
+    "required": ["decision"]
+}
+
+if LLM_BACKEND == 'dummy':
+    from dummy_llm import DummyLLM
+    phi_llm = DummyLLM()
+    phi_decision_llm = phi_llm
+    deepseek_llm = DummyLLM(think=True)
+else:
+    phi_llm = OllamaLLM(model=os.getenv('CLASSIFY_MODEL'), temperature=0.0)
+    phi_decision_llm = OllamaLLM(model=os.getenv('CLASSIFY_MODEL'), temperature=0.0,
+                                 num_predict=CLASSIFY_NUM_PREDICT)
+
+    deepseek_llm = OllamaLLM(model=os.getenv('REASON_MODEL'), num_predict=REASON_MAX_TOKENS or None)
+
+# Model that answers single classify calls; it is streamed without a chain,
+# since closing a chain's stream still drains the model's output
+classify_llm = phi_decision_llm.bind(format=DECISION_SCHEMA) if CLASSIFY_CONSTRAINED_OUTPUT else phi_decision_llm
+
+reason_llm = deepseek_llm if REASON_THINKING else deepseek_llm.bind(think=False)
+
+# LLM chains
+batch_initial_chain = batch_initial_prompt | phi_llm | parser
+
+# Worker pool sizes of the classify and reason stages. The pools are shared by every
+# file being evaluated, so they also cap the in-flight requests sent to each model.
+CLASSIFY_CONCURRENCY = int(os.getenv('CLASSIFY_CONCURRENCY', '4'))
+REASON_CONCURRENCY = int(os.getenv('REASON_CONCURRENCY', '2'))
+
+# Number of descriptions judged per classify call; 1 sends every description on its own
+CLASSIFY_BATCH_SIZE = int(os.getenv('CLASSIFY_BATCH_SIZE', '1'))
+
+classify_stage = Stage('classify', CLASSIFY_CONCURRENCY)
+reason_stage = Stage('reason', REASON_CONCURRENCY)
+
+Gauge('evaluation_stage_queue_depth', "Tasks waiting for a worker of each pipeline stage.", ['stage'],
+      callback=lambda: {(stage.name,): stage.stats()['queue_depth'] for stage in (classify_stage, reason_stage)})
+Gauge('evaluation_stage_active', "Tasks running on each pipeline stage.", ['stage'],
+      callback=lambda: {(stage.name,): stage.stats()['active'] for stage in (classify_stage, reason_stage)})
+
+
+def pipeline_stats():
+    """Get queue depth and throughput of the classify and reason stages."""
+    return [classify_stage.stats(), reason_stage.stats()]
+
+
+def cache_stats():
+    """Get the size and hit/miss counters of the in-memory result cache."""
+    return result_cache.stats()
+
+
+def semantic_cache_stats():
+    """Get the state and size of the semantic near-duplicate cache."""
+    return semantic_cache.stats()
+
+
+_DECISION_PATTERN = re.compile(r'pass|fail', re.IGNORECASE)
+
+
+def stream_decision(description, attempt=0):
+    """Stream the classify model's answer and stop it as soon as a decision appears.
+
+    Returns:
+        str: "PASS" or "FAIL", or None if the answer ended without a decision
+    """
+    answer = ''
+    with stage_timer('classify_llm'):
+        chunks = classify_llm.stream(initial_prompt.format(description=description),
+                                     config=llm_tracer.config('classify', [description], attempt=attempt,
+                                                              count_tokens=phi_decision_llm.get_num_tokens))
+        # Closing the stream early ends the request, so Ollama stops generating
+        with closing(chunks):
+            for chunk in chunks:
+                answer += chunk
+                match = _DECISION_PATTERN.search(answer)
+                if match:
+                    return match.group(0).upper()
+    return None
+
+
+def classify_description(description):
+    """Classify a single description with the classify model.
+
+    Returns:
+        str: "PASS" or "FAIL"
+    """
+    decision = stream_decision(description)
+
+    # Ensure valid decision; constrained output always has one, so this only retries unconstrained models
+    attempts = 0
+    while decision is None and attempts < 3:
+        malformed_decisions.inc(kind='single')
+        llm_retries.inc(stage='classify')
+        attempts += 1
+        decision = stream_decision(description, attempt=attempts)
+
+    return decision or "FAIL"
+
+
+_BATCH_DECISION_PATTERN = re.compile(r'^\W*(\d+)\W+(pass|fail)\b', re.IGNORECASE | re.MULTILINE)
+
+
+def parse_batch_decisions(output, count):
+    """Parse the numbered Pass/Fail list returned for a batch prompt.
+
+    Returns:
+        list: One "PASS"/"FAIL" per description in prompt order, or None if the
+        output does not contain exactly one decision for every number
+    """
+    decisions = {}
+    for number, decision in _BATCH_DECISION_PATTERN.findall(output):
+        index = int(number)
+        if index in decisions or not 1 <= index <= count:
+            return None
+        decisions[index] = decision.upper()
+
+    if len(decisions) != count:
+        return None
+    return [decisions[i] for i in range(1, count + 1)]
+
+
+def classify_batch(descriptions):
+    """Classify several descriptions with a single classify call.
+
+    Falls back to one call per description when the model's answer cannot
+    be matched to every description.
+
+    Returns:
+        list: "PASS" or "FAIL" for each description, in input order
+    """
+    if len(descriptions) == 1:
+        return [classify_description(descriptions[0])]
+
+    numbered = "\n".join(f"{i}. {description}" for i, description in enumerate(descriptions, start=1))
+    with stage_timer('classify_llm'):
+        output = batch_initial_chain.invoke({
+            "count": len(descriptions),
+            "descriptions": numbered,
+        }, config=llm_tracer.config('classify', descriptions))
+
+    decisions = parse_batch_decisions(output, len(descriptions))
+    if decisions is None:
+        malformed_decisions.inc(kind='batch')
+        logger.warning(f"Malformed batch classification for {len(descriptions)} descriptions, classifying one by one")
+        decisions = [classify_description(description) for description in descriptions]
+    return decisions
+
+
+class ThinkFilter:
+    """Drop <think>...</think> spans from streamed text as it arrives.
+
+    Tags split across chunks are recognized; text after a <think> that is
+    never closed is dropped. Chunks are counted as tokens, since Ollama
+    streams one token per chunk.
+    """
+
+    OPEN = '<think>'
+    CLOSE = '</think>'
+
+    def __init__(self):
+        self.thinking = False
+        self.thought_tokens = 0
+        self.answer_tokens = 0
+        self._pending = ''
+
+    def feed(self, chunk):
+        """Take the next chunk of the stream.
+
+        Returns:
+            str: The visible text that can be emitted so far
+        """
+        was_thinking = self.thinking
+        text = self._pending + chunk
+        visible = []
+        while True:
+            tag = self.CLOSE if self.thinking else self.OPEN
+            index = text.find(tag)
+            if index == -1:
+                break
+            if not self.thinking:
+                visible.append(text[:index])
+            text = text[index + len(tag):]
+            self.thinking = not self.thinking
+
+        # Hold back an end of the text that may be the start of a tag
+        tag = self.CLOSE if self.thinking else self.OPEN
+        held = next((n for n in range(min(len(tag) - 1, len(text)), 0, -1) if tag.startswith(text[-n:])), 0)
+        self._pending = text[len(text) - held:]
+        if not self.thinking:
+            visible.append(text[:len(text) - held])
+
+        visible = ''.join(visible)
+        if not visible and (was_thinking or self.thinking):
+            self.thought_tokens += 1
+        else:
+            self.answer_tokens += 1
+        return visible
+
+    def close(self):
+        """Return the visible text still held back at the end of the stream."""
+        pending, self._pending = self._pending, ''
+        return '' if self.thinking else pending
+
+
+def _stream_reasoning(llm, description, decision, attempt=0):
+    """Stream one answer of the reasoning model, removing its <think> blocks as they arrive.
+
+    Returns:
+        str: The visible answer, stripped
+    """
+    think_filter = ThinkFilter()
+    visible = []
+    filter_seconds = 0.0
+    with stage_timer('reason_llm'):
+        for chunk in llm.stream(followup_prompt.format(decision=decision, description=description),
+                                config=llm_tracer.config('reason', [description], attempt=attempt)):
+            started = time.perf_counter()
+            visible.append(think_filter.feed(chunk))
+            filter_seconds += time.perf_counter() - started
+        visible.append(think_filter.close())
+    stage_seconds.observe(filter_seconds, stage='think_strip')
+
+    reasoning_tokens.observe(think_filter.thought_tokens, kind='thought')
+    reasoning_tokens.observe(think_filter.answer_tokens, kind='answer')
+    return ''.join(visible).strip()
+
+
+class EmptyReasoningError(Exception):
+    """Raised when the reasoning model gave no visible answer for a row."""
+
+
+# Stored as the reasoning of a row the reasoning model gave no answer for
+REASONING_UNAVAILABLE = "No reasoning available: the reasoning model gave no visible answer."
+
+
+def reason_description(description, decision):
+    """Ask the reasoning model to justify a decision.
+
+    An answer left empty, e.g. because the model spent its REASON_MAX_TOKENS
+    budget thinking, is asked for once more without thinking.
+
+    Returns:
+        str: The reasoning with any <think> block removed
+
+    Raises:
+        EmptyReasoningError: If the model gave no visible answer, so no empty reasoning is stored
+    """
+    reasoning = _stream_reasoning(reason_llm, description, decision)
+    if not reasoning and REASON_THINKING:
+        reasoning_truncated.inc()
+        logger.warning(f"Reasoning model gave no visible answer, retrying without thinking: {description[:80]}")
+        llm_retries.inc(stage='reason')
+        reasoning = _stream_reasoning(deepseek_llm.bind(think=False), description, decision, attempt=1)
+    if not reasoning:
+        raise EmptyReasoningError(f"Reasoning model gave no visible answer for: {description[:80]}")
+    return reasoning
+
+
+def _chunked(items, size):
+    """Yield consecutive lists of at most size items."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _is_empty(description):
+    return pd.isna(description) or description.strip() == ''
+
+
+def _classify_rows(descriptions, timings=None):
+    """Classify stage: classify a batch of uncached descriptions.
+
+    Each classified description is queued on the reason stage, so the next
+    batch can be classified while these are being justified.
+
+    Returns:
+        list: A reason-stage Future per description, resolving to its evaluation
+    """
+    with stage_timer('classify', timings):
+        decisions = classify_batch(descriptions)
+    return [reason_stage.submit(_reason_row, description, decision, timings)
+            for description, decision in zip(descriptions, decisions)]
+
+
+def _reason_row(description, decision, timings=None):
+    """Reason stage: justify a classified row.
+
+    A row the reasoning model gives no answer for keeps its decision and is
+    flagged as failed, so the rest of the file is still evaluated. It is
+    neither cached nor reused by other rows or files.
+
+    Returns:
+        dict: The evaluation, with processed_id None until the writer stores it
+    """
+    try:
+        with stage_timer('reason', timings):
+            reasoning = reason_description(description, decision)
+    except EmptyReasoningError as e:
+        logger.error(f"{e}; storing the row without reasoning")
+        return {'processed_id': None, 'pass_': decision == "PASS", 'reasoning': REASONING_UNAVAILABLE,
+                'failed': True}
+    evaluation = {'processed_id': None, 'pass_': decision == "PASS", 'reasoning': reasoning}
+    # Later rows reuse this evaluation even before it is written
+    result_cache.put(description, evaluation)
+    return evaluation
+
+
+# A row waiting on the classify stage; position is its index in the classify batch
+_Deferred = namedtuple('_Deferred', ['future', 'position'])
+
+
+def _lookup_block(texts, in_flight):
+    """Find the results already known for a block's descriptions.
+
+    Returns:
+        tuple: (keys, cached, deferred) where keys maps each text to its
+        normalized form, cached maps texts to their stored evaluation and
+        deferred maps normalized texts to rows still in flight
+    """
+    # The in-memory cache answers repeated boilerplate; only its misses hit the database
+    keys = {text: normalize_description(text) for text in texts}
+    cached = {}
+    deferred = {}
+    for text, key in keys.items():
+        result = result_cache.get(text)
+        if result is not None:
+            cached[text] = result
+        elif key in in_flight:
+            deferred[key] = in_flight[key]
+    cache_lookups.inc(len(cached), tier='memory', result='hit')
+    cache_lookups.inc(len(keys) - len(cached), tier='memory', result='miss')
+    cache_lookups.inc(len(deferred), tier='in_flight', result='hit')
+
+    queried = [text for text in keys if text not in cached and keys[text] not in deferred]
+    stored = get_processed_descriptions(queried)
+    for text, result in stored.items():
+        result_cache.put(text, result)
+    cached.update(stored)
+    cache_lookups.inc(len(stored), tier='database', result='hit')
+    cache_lookups.inc(len(queried) - len(stored), tier='database', result='miss')
+
+    # Near-duplicates of evaluated descriptions reuse their evaluation
+    queried = [text for text in queried if text not in stored]
+    similar = semantic_cache.lookup(queried)
+    if similar:
+        evaluations = get_processed_descriptions_by_id({processed_id for processed_id, _ in similar.values()})
+        for text, (processed_id, score) in similar.items():
+            if processed_id in evaluations:
+                cached[text] = dict(evaluations[processed_id], semantic_score=score)
+    if semantic_cache.loaded:
+        hits = sum(1 for text in queried if text in cached)
+        cache_lookups.inc(hits, tier='semantic', result='hit')
+        cache_lookups.inc(len(queried) - hits, tier='semantic', result='miss')
+
+    return keys, cached, deferred
+
+
+def _row_entries(descriptions, timings=None):
+    """Yield one entry per CSV row, queuing uncached rows on the classify stage.
+
+    Rows are handled in blocks of INGEST_CHUNK_SIZE. Each block's cached results
+    are fetched with one bulk lookup, and descriptions of the block that
+    normalize to the same text are sent to the models once.
+
+    Yields:
+        None for empty rows, a (description, evaluation) pair for cached rows,
+        or a (description, _Deferred) pair for rows being evaluated
+    """
+    # Rows still being evaluated, by normalized text, so a later block reuses
+    # them instead of calling the models again before the first result is cached
+    in_flight = {}
+
+    try:
+        for block in _chunked(descriptions, INGEST_CHUNK_SIZE):
+            texts = [description for description in block if not _is_empty(description)]
+            for key in [key for key, deferred in in_flight.items() if _is_done(deferred)]:
+                del in_flight[key]
+
+            with stage_timer('cache_lookup', timings):
+                keys, cached, deferred = _lookup_block(texts, in_flight)
+
+            misses = {}
+            for text in texts:
+                if text not in cached and keys[text] not in deferred:
+                    misses.setdefault(keys[text], text)
+
+            for batch in _chunked(list(misses.items()), CLASSIFY_BATCH_SIZE):
+                future = classify_stage.submit(_classify_rows, [text for _, text in batch], timings,
+                                               items=len(batch))
+                for position, (key, _) in enumerate(batch):
+                    deferred[key] = in_flight[key] = _Deferred(future, position)
+
+            rows_evaluated.inc(len(block) - len(texts), kind='empty')
+            rows_evaluated.inc(len(texts), kind='description')
+            for description in block:
+                if _is_empty(description):
+                    yield None
+                elif description in cached:
+                    yield description, cached[description]
+                else:
+                    yield description, deferred[keys[description]]
+    except GeneratorExit:
+        # The evaluation stopped early; do not spend model calls on its queued rows
+        _cancel_deferred(list(in_flight.values()))
+        raise
+
+
+def _cancel_deferred(deferred_rows):
+    """Cancel the model calls of rows that are no longer wanted.
+
+    Queued classify tasks are cancelled, and so are the queued reason tasks of
+    batches already classified. Calls that are running are left to finish.
+    """
+    for deferred in deferred_rows:
+        if deferred.future.cancel() or not deferred.future.done() or deferred.future.exception() is not None:
+            continue
+        for reason_future in deferred.future.result():
+            reason_future.cancel()
+
+
+def _is_done(deferred):
+    """Whether a deferred row has been evaluated (or failed), so it is no longer in flight."""
+    if not deferred.future.done():
+        return False
+    if deferred.future.exception() is not None:
+        return True
+    return deferred.future.result()[deferred.position].done()
+
+
+def _resolve_row(entry):
+    if entry is None or not isinstance(entry[1], _Deferred):
+        return entry
+    description, deferred = entry
+    # Rows sharing an evaluation keep their own original text
+    return description, deferred.future.result()[deferred.position].result()
+
+
+def _evaluated_rows(descriptions, timings=None):
+    """Run rows through the classify and reason stages, yielding results in input order.
+
+    The next block of rows is queued while the current one is being consumed, so
+    the stages do not drain at block boundaries.
+
+    Args:
+        descriptions (iterable): The rows' descriptions
+        timings (StageTimings): Optional, receives the time spent per stage
+    """
+    pending = deque()
+    entries = _row_entries(descriptions, timings)
+    try:
+        for entry in entries:
+            pending.append(entry)
+            if len(pending) > INGEST_CHUNK_SIZE:
+                yield _resolve_row(pending.popleft())
+        while pending:
+            yield _resolve_row(pending.popleft())
+    finally:
+        # Only does anything when the consumer stopped before the last row
+        entries.close()
+        _cancel_deferred([entry[1] for entry in pending if entry is not None and isinstance(entry[1], _Deferred)])
+
+
+def _timed_reads(descriptions, read_times):
+    """Pass rows through, appending the time each one is read to read_times."""
+    for description in descriptions:
+        read_times.append(time.perf_counter())
+        yield description
+
+
+def evaluate_file(file_id, file_path, on_row=None, owner=None):
+    """Evaluate every description in an uploaded CSV file.
+
+    Called by the background workers once a file has been claimed from the queue.
+    Failures are recorded on the UploadedFile row instead of being raised.
+
+    Args:
+        file_id (int): ID of the UploadedFile being evaluated
+        file_path (str): Location of the uploaded CSV on disk
+        on_row (callable): Optional, called with each row's result (None for
+            an empty row) and the seconds since the row was read, just before
+            the row is handed to the writer
+        owner (str): The worker that claimed the file from the queue; the
+            evaluation stops if another worker takes the file over
+
+    Returns:
+        bool: True if the file was evaluated, False otherwise
+    """
+    try:
+        # An interrupted evaluation continues after the last row it stored
+        checkpoint = begin_file_evaluation(file_id)
+        if checkpoint is None:
+            raise Exception("File record not found")
+        if checkpoint['rows_done']:
+            logger.info(f"Resuming file {file_id} after row {checkpoint['rows_done']}")
+
+        # Rows are parsed as they are read from disk, so evaluation starts before
+        # the whole file has been read
+        read_progress = {}
+        timings = StageTimings()
+        descriptions = iter_descriptions(file_path, progress=read_progress, timings=timings)
+        descriptions = islice(descriptions, checkpoint['rows_done'], None)
+        if on_row is not None:
+            read_times = deque()
+            descriptions = _timed_reads(descriptions, read_times)
+
+        total_count = checkpoint['rows_done']
+
+        # Rows are evaluated concurrently but come back, and are stored, in input order.
+        # The writer advances the file's counters with every batch it stores
+        writer = DescriptionWriter(file_id, timings=timings, owner=owner)
+        try:
+            # Sampled files also get a cProfile profile of this loop
+            with loop_profiler.profile(file_id), closing(_evaluated_rows(descriptions, timings)) as rows:
+                for row in rows:
+                    total_count += 1
+                    writer.total_rows = max(total_count, estimate_total_rows(read_progress, checkpoint['file_size']))
+                    if on_row is not None:
+                        on_row(row, time.perf_counter() - read_times.popleft())
+                    if row is None:
+                        writer.skip()
+                        continue
+
+                    description, evaluation = row
+                    # Store the description and link it to this file and its evaluation
+                    writer.add(description, evaluation)
+        finally:
+            writer.close()
+        # Counted by the writer, which stores a text evaluated meanwhile by another
+        # file with that file's evaluation
+        pass_count = checkpoint['pass_count'] + writer.pass_count
+
+        semantic_cache.save()
+
+        # Update file statistics, with the time the file spent in each stage
+        update_file_statistics(file_id, total_count, pass_count, timings=timings.as_dict())
+
+        # Update processing status
+        update_file_processing_status(file_id, "completed")
+        return True
+
+    except FileRemovedError:
+        # The file was deleted mid-evaluation, or its lease expired and another worker has it now
+        logger.info(f"Stopped evaluating file {file_id}: it was removed or taken over")
+        return False
+
+    except Exception as e:
+        logger.error(f"Error processing file {file_id}: {str(e)}")
+        update_file_processing_status(file_id, "error", error_message=f"Error processing file: {str(e)}")
+        return False
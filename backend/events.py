@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import threading
+from collections import deque, namedtuple
+
+# Number of recent events kept so reconnecting clients can catch up
+EVENT_BUFFER_SIZE = int(os.getenv('EVENT_BUFFER_SIZE', '1000'))
+# Seconds between keepalive comments on an idle stream
+EVENT_KEEPALIVE_SECONDS = float(os.getenv('EVENT_KEEPALIVE_SECONDS', '15'))
+
+Event = namedtuple('Event', ['id', 'type', 'file_id', 'data'])
+
+
+class EventBroker:
+    """In-process publish/subscribe of evaluation events.
+
+    Events get increasing ids and the most recent ones are kept in a ring
+    buffer, so a client that reconnects with the last id it saw receives
+    everything it missed. Ids start from the current time in milliseconds,
+    so ids handed out before a restart are older than the whole new buffer
+    and the client is told to reload instead.
+    """
+
+    def __init__(self, buffer_size=EVENT_BUFFER_SIZE):
+        self._events = deque(maxlen=buffer_size)
+        self._condition = threading.Condition()
+        self._next_id = int(time.time() * 1000)
+        self._file_streams = {}  # Open streams per file id
+        self._unsent = {}  # Per file, id of the next event when an event was last skipped
+
+    def publish(self, event_type, data, file_id=None):
+        """Record an event and wake up the streams waiting for one."""
+        with self._condition:
+            self._append(event_type, data, file_id)
+
+    def _append(self, event_type, data, file_id):
+        self._events.append(Event(self._next_id, event_type, file_id, data))
+        self._next_id += 1
+        self._condition.notify_all()
+
+    def publish_to_file_streams(self, event_type, make_data, file_id):
+        """Publish a per-file event only while a stream of that file is open.
+
+        Used for bulky events, such as the rows of a file, so they neither take
+        memory nor push other events out of the buffer when nobody reads them.
+        A stream of the file that later resumes from before a skipped event is
+        sent a 'reset' instead.
+
+        Args:
+            make_data (callable): Builds the event's data, only called if it is published
+
+        Returns:
+            bool: Whether the event was published
+        """
+        with self._condition:
+            if not self._file_streams.get(file_id):
+                self._unsent[file_id] = self._next_id
+                return False
+            self._append(event_type, make_data(), file_id)
+            return True
+
+    def _events_after(self, last_id):
+        """Return the buffered events after last_id, or None if some were already dropped."""
+        if not self._events:
+            return [] if last_id < self._next_id else None
+        if last_id < self._events[0].id - 1 or last_id >= self._next_id:
+            return None
+        return [event for event in self._events if event.id > last_id]
+
+    def subscribe(self, last_id=None, file_id=None, keepalive=EVENT_KEEPALIVE_SECONDS):
+        """Yield events as they are published, blocking in between.
+
+        Args:
+            last_id (int): Id of the last event the client saw; None to start
+                with the next published event
+            file_id (int): Only yield events of this file. Per-row 'rows'
+                events are only yielded when a file is given
+            keepalive (float): Seconds after which None is yielded if nothing
+                happened, so the caller can check the connection
+
+        Yields:
+            Event, None for a keepalive, or an Event of type 'reset' when the
+            events after last_id are no longer available or, for a file,
+            were skipped by publish_to_file_streams
+        """
+        with self._condition:
+            # Events of the file may have been skipped while no stream of it was open
+            missed = file_id is not None and last_id is not None and last_id < self._unsent.get(file_id, last_id)
+            if last_id is None or missed:
+                last_id = self._next_id - 1
+            if file_id is not None:
+                self._file_streams[file_id] = self._file_streams.get(file_id, 0) + 1
+
+        try:
+            if missed:
+                yield Event(last_id, 'reset', None, {})
+            yield from self._stream(last_id, file_id, keepalive)
+        finally:
+            if file_id is not None:
+                with self._condition:
+                    self._file_streams[file_id] -= 1
+
+    def _stream(self, last_id, file_id, keepalive):
+        while True:
+            with self._condition:
+                events = self._events_after(last_id)
+                if events == []:
+                    self._condition.wait(keepalive)
+                    events = self._events_after(last_id)
+                if events is None:
+                    latest_id = self._next_id - 1
+
+            if events is None:
+                # The client missed events; it has to reload its state
+                last_id = latest_id
+                yield Event(last_id, 'reset', None, {})
+                continue
+            if not events:
+                yield None
+                continue
+
+            for event in events:
+                last_id = event.id
+                if file_id is None and event.type == 'rows':
+                    continue
+                if file_id is not None and event.file_id != file_id:
+                    continue
+                yield event
+
+
+def format_sse(event):
+    """Serialize an event, or a keepalive for None, in text/event-stream format."""
+    if event is None:
+        return ": keepalive\n\n"
+    return f"id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data)}\n\n"
+
+
+event_broker = EventBroker()
@@ -0,0 +1,104 @@
+import os
+import io
+import csv
+import zlib
+
+# Rows serialized per chunk of a streamed export
+EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', '1000'))
+
+EXPORT_COLUMNS = ['description', 'decision', 'reasoning']
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_csv(rows, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Serialize rows as CSV, chunk_rows at a time.
+
+    Args:
+        rows (iterable): Dicts with the EXPORT_COLUMNS keys
+
+    Yields:
+        str: The header, then one chunk of CSV lines per batch of rows
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    for batch in _batched(rows, chunk_rows):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+def iter_gzip(chunks):
+    """Gzip-compress a stream of text chunks on the fly."""
+    compressor = zlib.compressobj(wbits=31)  # 31 selects the gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that collects what is written until it is drained."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def parquet_available():
+    """Whether the optional pyarrow dependency for Parquet export is installed."""
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def iter_parquet(rows, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Serialize rows as a Parquet file, one row group per batch of rows.
+
+    Requires pyarrow.
+
+    Yields:
+        bytes: The file contents, as each row group is written
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(column, pa.string()) for column in EXPORT_COLUMNS])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in _batched(rows, chunk_rows):
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,120 @@
+import os
+import csv
+import shutil
+import tempfile
+import hashlib
+import pandas as pd
+
+from metrics import stage_timer
+
+# Rows parsed per pandas chunk and bytes copied per write while saving an upload
+INGEST_CHUNK_SIZE = int(os.getenv('INGEST_CHUNK_SIZE', '1000'))
+UPLOAD_COPY_BUFFER = 1024 * 1024
+
+def read_upload_header(file):
+    """Read the CSV header of an uploaded file without consuming its stream.
+
+    Args:
+        file (FileStorage): The uploaded file
+
+    Returns:
+        list: Column names of the CSV
+    """
+    stream = file.stream
+    header = stream.readline()
+    stream.seek(0)
+    if isinstance(header, bytes):
+        header = header.decode('utf-8-sig', errors='replace')
+    return next(csv.reader([header]), [])
+
+
+def upload_size(file):
+    """Size in bytes of an uploaded file, measured on its stream."""
+    stream = file.stream
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+def hash_upload(file):
+    """SHA-256 of an uploaded file's bytes, read from its stream in chunks."""
+    stream = file.stream
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(UPLOAD_COPY_BUFFER), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def stored_upload_name(content_hash):
+    """Name an upload is stored under in the upload folder, given its content hash."""
+    return f"{content_hash}.csv"
+
+
+def write_upload(file, file_path):
+    """Copy an uploaded file to disk in chunks, replacing file_path atomically.
+
+    The copy is written to a temporary file next to file_path and renamed when
+    complete, so readers never see a partial file and identical uploads saved
+    at the same time do not overwrite each other's writes.
+    """
+    descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or '.', suffix='.part')
+    try:
+        with os.fdopen(descriptor, 'wb') as destination:
+            shutil.copyfileobj(file.stream, destination, UPLOAD_COPY_BUFFER)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def iter_descriptions(file_path, chunksize=INGEST_CHUNK_SIZE, progress=None, timings=None):
+    """Stream the 'description' column of a CSV file.
+
+    Only the description column is parsed, chunksize rows at a time, so memory
+    use does not depend on the size of the file.
+
+    Args:
+        file_path (str): Location of the CSV file
+        chunksize (int): Number of rows parsed at a time
+        progress (dict): Optional, updated with 'rows' and 'bytes' read so far
+            and 'done' once the whole file has been parsed
+        timings (StageTimings): Optional, receives the time spent reading and parsing
+
+    Yields:
+        Each description in file order; empty cells are yielded as NaN
+    """
+    if progress is not None:
+        progress.update(rows=0, bytes=0, done=False)
+    with open(file_path, 'rb') as reader:
+        chunks = pd.read_csv(reader, usecols=['description'], dtype={'description': str}, chunksize=chunksize)
+        while True:
+            with stage_timer('read_csv', timings):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            if progress is not None:
+                progress['rows'] += len(chunk)
+                progress['bytes'] = reader.tell()
+            yield from chunk['description'].tolist()
+    if progress is not None:
+        progress['done'] = True
+
+
+def estimate_total_rows(progress, file_size):
+    """Estimate the number of rows in a file from how far iter_descriptions got.
+
+    Args:
+        progress (dict): Progress filled in by iter_descriptions
+        file_size (int): Size of the complete file in bytes, if known
+
+    Returns:
+        int: The exact row count once the file was parsed, otherwise the rows
+        read so far extrapolated to the whole file
+    """
+    rows = progress.get('rows', 0)
+    if progress.get('done') or not file_size or not progress.get('bytes'):
+        return rows
+    return max(rows, int(rows * file_size / progress['bytes']))
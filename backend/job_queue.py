@@ -0,0 +1,129 @@
+import os
+import time
+import uuid
+import socket
+import logging
+import threading
+from datetime import datetime
+
+from database import claim_next_file, renew_file_leases, get_evaluated_descriptions, FILE_LEASE_SECONDS, \
+    load_existing_files_to_queue, update_file_processing_status, get_uploaded_file_by_id, count_files_by_status
+from evaluator import evaluate_file
+from semantic_cache import init_semantic_cache
+from metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+# Number of files evaluated in parallel and how often idle workers re-check the queue
+NUM_WORKERS = int(os.getenv('EVALUATION_WORKERS', '2'))
+POLL_INTERVAL = float(os.getenv('QUEUE_POLL_INTERVAL', '5'))
+
+# Owner of the files claimed by this process; the random part tells a restarted
+# process apart from the one that held the same pid before
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_wakeup = threading.Event()
+_workers = []
+_start_lock = threading.Lock()
+
+
+def _queued_file_counts():
+    counts = count_files_by_status()
+    return {(status,): counts.get(status, 0) for status in ('waiting', 'processing')}
+
+
+Gauge('evaluation_queue_files', "Uploaded files waiting for or undergoing evaluation.", ['status'],
+      callback=_queued_file_counts)
+
+
+def notify_workers():
+    """Wake idle workers so newly queued files are picked up immediately."""
+    _wakeup.set()
+
+
+def _worker_loop(upload_folder):
+    while True:
+        try:
+            job = claim_next_file(WORKER_ID)
+        except Exception as e:
+            logger.error(f"Error claiming file from queue: {e}")
+            job = None
+
+        if job is None:
+            _wakeup.wait(POLL_INTERVAL)
+            _wakeup.clear()
+            continue
+
+        file_id, stored_name = job
+        logger.info(f"Evaluating file {file_id} ({stored_name})")
+        evaluate_file(file_id, os.path.join(upload_folder, stored_name), owner=WORKER_ID)
+
+
+def _renew_leases_loop():
+    """Keep the files this process is evaluating claimed, so no other worker takes them over."""
+    while True:
+        time.sleep(FILE_LEASE_SECONDS / 3)
+        renew_file_leases(WORKER_ID)
+
+
+def _is_leased(uploaded_file):
+    """Whether a live worker, possibly in another process or node, is evaluating the file."""
+    return uploaded_file.processing_status == 'processing' and uploaded_file.lease_expires_at is not None \
+        and uploaded_file.lease_expires_at > datetime.now()
+
+
+def _resume_unfinished_files(upload_folder):
+    """Check the files left in the queue by a previous run before workers pick them up.
+
+    A file whose stored copy is missing can never be completed, so it is
+    marked as failed. The others continue from their last stored row. Files
+    whose lease a live worker holds are left alone.
+    """
+    for item in load_existing_files_to_queue():
+        uploaded_file = get_uploaded_file_by_id(item['id'])
+        if not uploaded_file or _is_leased(uploaded_file):
+            continue
+        file_path = os.path.join(upload_folder, uploaded_file.stored_name())
+        if not os.path.exists(file_path):
+            update_file_processing_status(item['id'], "error", error_message="Uploaded file is missing")
+            logger.warning(f"File {item['id']} ({item['file_name']}) is missing from {upload_folder}")
+        elif item['num_processed']:
+            logger.info(f"File {item['id']} ({item['file_name']}) will resume after row {item['num_processed']}")
+
+
+def start_workers(upload_folder, num_workers=NUM_WORKERS):
+    """Start the background worker pool that drains the evaluation queue.
+
+    The queue itself lives in the uploaded_files table: every file with
+    processing_status 'waiting' is pending work. A claimed file is leased to
+    its worker, and the lease is renewed while this process runs; a file left
+    in 'processing' by a stopped process or node is claimed again once its
+    lease expires, and resumes from its last stored row. Only the first call
+    starts workers; later calls return immediately.
+
+    Args:
+        upload_folder (str): Directory the uploaded CSV files are stored in
+        num_workers (int): Number of worker threads to start
+    """
+    if _workers:
+        return
+    with _start_lock:
+        if not _workers:
+            _start(upload_folder, num_workers)
+
+
+def _start(upload_folder, num_workers):
+    init_semantic_cache(get_evaluated_descriptions)
+
+    _resume_unfinished_files(upload_folder)
+    threading.Thread(target=_renew_leases_loop, name="evaluation-lease-renewal", daemon=True).start()
+
+    for i in range(num_workers):
+        worker = threading.Thread(
+            target=_worker_loop,
+            args=(upload_folder,),
+            name=f"evaluation-worker-{i}",
+            daemon=True
+        )
+        worker.start()
+        _workers.append(worker)
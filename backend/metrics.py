@@ -0,0 +1,172 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, of the buckets of the timing histograms
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in labels)
+    return '{' + pairs + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base of the metric types: a named family of samples keyed by label values."""
+
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def samples(self):
+        """Return (suffix, labels, value) tuples in exposition order."""
+        with self._lock:
+            return [('', tuple(zip(self.labelnames, key)), value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """A monotonically increasing count."""
+
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, set directly or read from a callback when scraped.
+
+    Args:
+        callback (callable): Optional, returns a dict mapping label value tuples
+            to the current values
+    """
+
+    type_name = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self._callback = callback
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self):
+        if self._callback is None:
+            return super().samples()
+        return [('', tuple(zip(self.labelnames, key)), value) for key, value in sorted(self._callback().items())]
+
+
+class Histogram(_Metric):
+    """Distribution of observed durations over cumulative buckets."""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                labels = tuple(zip(self.labelnames, key))
+                for bound, count in zip(self.buckets, counts):
+                    samples.append(('_bucket', labels + (('le', _format_value(bound)),), count))
+                samples.append(('_sum', labels, total))
+                samples.append(('_count', labels, counts[-1]))
+        return samples
+
+
+REGISTRY = []
+
+
+def render():
+    """All registered metrics in the Prometheus text exposition format."""
+    return '\n'.join(metric.render() for metric in REGISTRY) + '\n'
+
+
+class StageTimings:
+    """Seconds spent per stage on one file, summed across threads."""
+
+    def __init__(self):
+        self._seconds = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self._seconds[stage] = self._seconds.get(stage, 0.0) + seconds
+
+    def as_dict(self):
+        with self._lock:
+            return {stage: round(seconds, 3) for stage, seconds in self._seconds.items()}
+
+
+# Hot-path metrics of the evaluation pipeline
+stage_seconds = Histogram('evaluation_stage_seconds', "Time spent in each evaluation stage.", ['stage'])
+cache_lookups = Counter('evaluation_cache_lookups_total',
+                        "Distinct descriptions looked up per cache tier, by result.", ['tier', 'result'])
+llm_retries = Counter('evaluation_llm_retries_total', "Model calls repeated after an unusable answer.", ['stage'])
+malformed_decisions = Counter('evaluation_malformed_decisions_total',
+                              "Classify answers without a usable decision.", ['kind'])
+rows_evaluated = Counter('evaluation_rows_total', "Rows read from uploaded files.", ['kind'])
+reasoning_tokens = Histogram('evaluation_reasoning_tokens', "Tokens the reasoning model generated per row, "
+                             "split into hidden thoughts and the kept answer.", ['kind'],
+                             buckets=(0, 16, 64, 128, 256, 512, 1024, 2048, 4096, 8192))
+reasoning_truncated = Counter('evaluation_reasoning_truncated_total',
+                              "Reasoning answers left empty, e.g. because the token budget ran out while "
+                              "thinking; each is asked for again without thinking.")
+
+
+@contextmanager
+def stage_timer(stage, timings=None):
+    """Time a block into the stage histogram and, if given, a file's StageTimings."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, stage=stage)
+        if timings is not None:
+            timings.add(stage, elapsed)
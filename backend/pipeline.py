@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import loop_profiler
+
+# Window over which a stage's recent throughput is measured
+THROUGHPUT_WINDOW_SECONDS = 60
+
+
+class Stage:
+    """A pipeline stage backed by its own worker pool.
+
+    Tracks how many tasks are waiting for a worker, how many are running and
+    how many items the stage has completed, so pool sizes can be tuned per model.
+    """
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-stage")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed_tasks = 0
+        self._completed_items = 0
+        self._failed_tasks = 0
+        self._busy_seconds = 0.0
+        self._recent = deque()
+
+    def submit(self, fn, *args, items=1):
+        """Queue fn(*args) on the stage's pool.
+
+        Args:
+            items (int): Number of descriptions the task handles, used for throughput
+
+        Returns:
+            Future: Resolves to the return value of fn
+        """
+        with self._lock:
+            self._queued += 1
+        future = self._executor.submit(self._run, fn, args, items)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future):
+        # A task cancelled before it started never reaches _run
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def _run(self, fn, args, items):
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+        start = time.perf_counter()
+        failed = True
+        try:
+            # Part of the profile of a sampled file's evaluation
+            with loop_profiler.task():
+                result = fn(*args)
+            failed = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            now = time.monotonic()
+            with self._lock:
+                self._active -= 1
+                self._busy_seconds += elapsed
+                if failed:
+                    self._failed_tasks += 1
+                else:
+                    self._completed_tasks += 1
+                    self._completed_items += items
+                    self._recent.append((now, items))
+                self._prune(now)
+
+    def _prune(self, now):
+        while self._recent and now - self._recent[0][0] > THROUGHPUT_WINDOW_SECONDS:
+            self._recent.popleft()
+
+    def stats(self):
+        """Get a snapshot of the stage's queue depth and throughput."""
+        with self._lock:
+            self._prune(time.monotonic())
+            tasks = self._completed_tasks + self._failed_tasks
+            return {
+                'name': self.name,
+                'workers': self.workers,
+                'queue_depth': self._queued,
+                'active': self._active,
+                'completed_tasks': self._completed_tasks,
+                'completed_items': self._completed_items,
+                'failed_tasks': self._failed_tasks,
+                'items_per_second': sum(items for _, items in self._recent) / THROUGHPUT_WINDOW_SECONDS,
+                'avg_task_seconds': self._busy_seconds / tasks if tasks else 0.0,
+                'utilization': self._active / self.workers if self.workers else 0.0
+            }
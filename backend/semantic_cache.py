@@ -0,0 +1,148 @@
+import os
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# The semantic tier is opt-in: it needs sentence-transformers and faiss-cpu, and
+# loads an embedding model into memory
+SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+SEMANTIC_CACHE_MODEL = os.getenv('SEMANTIC_CACHE_MODEL', 'all-MiniLM-L6-v2')
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.92'))
+SEMANTIC_CACHE_PATH = os.getenv('SEMANTIC_CACHE_PATH', os.path.join('data', 'db', 'semantic_cache.faiss'))
+
+
+class SemanticCache:
+    """Near-duplicate lookup of evaluated descriptions using sentence embeddings.
+
+    Every stored evaluation (ProcessedDescription) is represented in a FAISS
+    inner-product index by the normalized embedding of one of its descriptions,
+    with the evaluation's id as the vector id. A new description whose cosine
+    similarity to a stored one reaches the threshold reuses that evaluation.
+    """
+
+    def __init__(self, model_name=SEMANTIC_CACHE_MODEL, threshold=SEMANTIC_CACHE_THRESHOLD,
+                 index_path=SEMANTIC_CACHE_PATH):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.index_path = index_path
+        self._model = None
+        self._index = None
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def load(self, evaluated_descriptions):
+        """Load the embedding model and the persisted index.
+
+        Args:
+            evaluated_descriptions (callable): Returns (processed_id, description) pairs,
+                used to build the index when there is no persisted one yet
+        """
+        import faiss
+        from sentence_transformers import SentenceTransformer
+
+        with self._lock:
+            if self._index is not None:
+                return
+            self._model = SentenceTransformer(self.model_name)
+            if os.path.exists(self.index_path):
+                self._index = faiss.read_index(self.index_path)
+                logger.info(f"Loaded semantic cache with {self._index.ntotal} evaluations")
+                return
+
+            dimension = self._model.get_sentence_embedding_dimension()
+            self._index = faiss.IndexIDMap(faiss.IndexFlatIP(dimension))
+
+        pairs = list(evaluated_descriptions())
+        if pairs:
+            self.add([description for _, description in pairs], [processed_id for processed_id, _ in pairs])
+        self.save()
+        logger.info(f"Built semantic cache with {len(pairs)} evaluations")
+
+    @property
+    def loaded(self):
+        return self._index is not None
+
+    def _embed(self, descriptions):
+        return self._model.encode(list(descriptions), normalize_embeddings=True,
+                                  convert_to_numpy=True).astype('float32')
+
+    def lookup(self, descriptions):
+        """Find the closest stored evaluation for each description.
+
+        Returns:
+            dict: Maps each description with a match at or above the threshold
+            to a (processed_id, score) tuple
+        """
+        if not descriptions or not self.loaded:
+            return {}
+        embeddings = self._embed(descriptions)
+        with self._lock:
+            if self._index.ntotal == 0:
+                return {}
+            scores, ids = self._index.search(embeddings, 1)
+
+        matches = {}
+        for description, score, processed_id in zip(descriptions, scores[:, 0], ids[:, 0]):
+            if processed_id != -1 and score >= self.threshold:
+                matches[description] = (int(processed_id), float(score))
+        return matches
+
+    def add(self, descriptions, processed_ids):
+        """Add newly stored evaluations to the index."""
+        if not descriptions or not self.loaded:
+            return
+        import numpy as np
+
+        embeddings = self._embed(descriptions)
+        with self._lock:
+            self._index.add_with_ids(embeddings, np.asarray(processed_ids, dtype='int64'))
+            self._dirty = True
+
+    def remove(self, processed_ids):
+        """Drop deleted evaluations from the index."""
+        if not processed_ids or not self.loaded:
+            return
+        import numpy as np
+
+        with self._lock:
+            self._index.remove_ids(np.asarray(list(processed_ids), dtype='int64'))
+            self._dirty = True
+
+    def save(self):
+        """Persist the index if it changed since it was last saved."""
+        if not self.loaded:
+            return
+        import faiss
+
+        with self._lock:
+            if not self._dirty and os.path.exists(self.index_path):
+                return
+            os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+            temp_path = self.index_path + '.tmp'
+            faiss.write_index(self._index, temp_path)
+            os.replace(temp_path, self.index_path)
+            self._dirty = False
+
+    def stats(self):
+        return {
+            'enabled': self.loaded,
+            'model': self.model_name,
+            'threshold': self.threshold,
+            'size': self._index.ntotal if self.loaded else 0
+        }
+
+
+semantic_cache = SemanticCache()
+
+
+def init_semantic_cache(evaluated_descriptions):
+    """Load the semantic cache when it is enabled and its dependencies are installed."""
+    if not SEMANTIC_CACHE_ENABLED:
+        return
+    try:
+        semantic_cache.load(evaluated_descriptions)
+    except ImportError as e:
+        logger.warning(f"Semantic cache disabled, missing dependency: {e}")
+    except Exception as e:
+        logger.error(f"Error loading semantic cache: {e}")
@@ -0,0 +1,18 @@
+import os
+import sys
+import tempfile
+
+# The backend modules import each other by their flat names
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SEMANTIC_CACHE_ENABLED', 'false')
+os.environ.setdefault('LLM_BACKEND', 'dummy')
+os.environ.setdefault('DUMMY_LLM_LATENCY', '0')
+os.environ.setdefault('DUMMY_LLM_JITTER', '0')
+
+# The modules create their data directories (traces, profiles) relative to the
+# working directory; keep those out of the source tree
+_workdir = tempfile.mkdtemp(prefix='description-tests-')
+os.chdir(_workdir)
+
+# Without DATABASE_URL the tests use a new SQLite database
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_workdir, 'test.db')}")
@@ -0,0 +1,33 @@
+"""Tests of the cache key normalization."""
+import pytest
+from cache import normalize_description, NORMALIZATION_STEPS
+
+
+def test_default_steps_ignore_case_spacing_and_trailing_punctuation():
+    assert normalize_description("  Customer   ID,\tunique per row. ") == "customer id, unique per row"
+
+
+def test_nfc_joins_combining_characters():
+    assert normalize_description("Cafe\u0301 name", steps=['nfc']) == "Caf\u00e9 name"
+
+
+def test_whitespace_collapses_runs_of_whitespace():
+    assert normalize_description("a \t b\n\nc", steps=['whitespace']) == "a b c"
+
+
+def test_casefold_handles_more_than_lowercase():
+    assert normalize_description("STRASSE Straße", steps=['casefold']) == "strasse strasse"
+
+
+def test_punctuation_only_strips_trailing_punctuation():
+    assert normalize_description("e.g. 42, or 7?!.", steps=['punctuation']) == "e.g. 42, or 7"
+
+
+def test_no_steps_only_strips():
+    assert normalize_description("  As Uploaded.  ", steps=[]) == "As Uploaded."
+
+
+@pytest.mark.parametrize('step', sorted(NORMALIZATION_STEPS))
+def test_steps_are_idempotent(step):
+    once = normalize_description(" Cafe\u0301  NAME ;. ", steps=[step])
+    assert normalize_description(once, steps=[step]) == once
@@ -0,0 +1,81 @@
+"""Tests of evaluate_file with the dummy models and the test database."""
+import os
+
+from benchmark import generate_rows, write_csv
+from database import add_uploaded_file, get_uploaded_file_by_id, get_processed_descriptions, iter_file_descriptions
+from evaluator import evaluate_file
+
+
+class Interrupted(Exception):
+    pass
+
+
+def _upload(tmp_path, descriptions):
+    path = os.path.join(tmp_path, 'upload.csv')
+    write_csv(path, descriptions)
+    return add_uploaded_file('upload.csv', os.path.getsize(path)), path
+
+
+def _check_stored(file_id, descriptions):
+    rows = list(iter_file_descriptions(file_id))
+    # Empty rows are counted but not stored
+    assert [row['description'] for row in rows] == [description for description in descriptions if description]
+
+    uploaded_file = get_uploaded_file_by_id(file_id)
+    assert uploaded_file.processing_status == 'completed'
+    assert uploaded_file.num_processed == len(descriptions)
+    assert uploaded_file.total_descs == len(descriptions)
+    assert uploaded_file.pass_count == sum(row['decision'] == 'PASS' for row in rows)
+
+
+def test_rows_are_stored_in_input_order(tmp_path):
+    descriptions = generate_rows(300, duplicate_ratio=0.3, seed=101)
+    descriptions[10] = descriptions[200] = ''
+    file_id, path = _upload(tmp_path, descriptions)
+
+    assert evaluate_file(file_id, path)
+    _check_stored(file_id, descriptions)
+
+
+def test_interrupted_file_resumes_after_its_stored_rows(tmp_path):
+    descriptions = generate_rows(250, duplicate_ratio=0.2, seed=102)
+    file_id, path = _upload(tmp_path, descriptions)
+
+    seen = []
+
+    def interrupt(row, latency):
+        seen.append(row)
+        if len(seen) > 120:
+            raise Interrupted()
+
+    assert not evaluate_file(file_id, path, on_row=interrupt)
+    assert get_uploaded_file_by_id(file_id).num_processed == 120
+
+    resumed = []
+    assert evaluate_file(file_id, path, on_row=lambda row, latency: resumed.append(row))
+    assert len(resumed) == len(descriptions) - 120
+    _check_stored(file_id, descriptions)
+
+
+
+def test_row_without_reasoning_fails_alone(tmp_path, monkeypatch):
+    import evaluator
+    descriptions = generate_rows(80, duplicate_ratio=0.2, seed=104)
+    unanswered = descriptions[5]
+    reason_description = evaluator.reason_description
+
+    def reason(description, decision):
+        if description == unanswered:
+            raise evaluator.EmptyReasoningError("no visible answer")
+        return reason_description(description, decision)
+
+    monkeypatch.setattr(evaluator, 'reason_description', reason)
+    file_id, path = _upload(tmp_path, descriptions)
+
+    assert evaluate_file(file_id, path)
+    _check_stored(file_id, descriptions)
+    rows = list(iter_file_descriptions(file_id))
+    failed = [row for row in rows if row['reasoning'] == evaluator.REASONING_UNAVAILABLE]
+    assert failed and all(row['description'] == unanswered for row in failed)
+    # The failed evaluation is not reused by a later file
+    assert unanswered not in get_processed_descriptions([unanswered])
@@ -0,0 +1,49 @@
+"""Tests of the parsing helpers of the evaluator, run offline with the dummy models."""
+from evaluator import parse_batch_decisions, ThinkFilter
+
+
+def test_batch_decisions_in_prompt_order():
+    output = "Here are the decisions:\n2. Fail\n1) pass\n3 - PASS"
+    assert parse_batch_decisions(output, 3) == ["PASS", "FAIL", "PASS"]
+
+
+def test_batch_decisions_rejects_duplicate_numbers():
+    assert parse_batch_decisions("1. Pass\n2. Fail\n2. Pass", 2) is None
+
+
+def test_batch_decisions_rejects_out_of_range_numbers():
+    assert parse_batch_decisions("0. Pass\n1. Pass\n2. Fail", 2) is None
+    assert parse_batch_decisions("1. Pass\n2. Fail\n3. Fail", 2) is None
+
+
+def test_batch_decisions_rejects_missing_numbers():
+    assert parse_batch_decisions("1. Pass\n3. Fail", 3) is None
+
+
+def _filter(chunks):
+    think_filter = ThinkFilter()
+    visible = ''.join(think_filter.feed(chunk) for chunk in chunks) + think_filter.close()
+    return visible, think_filter
+
+
+def test_think_filter_drops_think_block():
+    visible, think_filter = _filter(["<think>", "weighing", " it", "</think>", "Clear", " answer."])
+    assert visible == "Clear answer."
+    assert think_filter.thought_tokens == 4
+    assert think_filter.answer_tokens == 2
+
+
+def test_think_filter_tags_split_across_chunks():
+    visible, _ = _filter(["Before <th", "ink>hid", "den</thi", "nk> after"])
+    assert visible == "Before  after"
+
+
+def test_think_filter_releases_text_that_only_looks_like_a_tag():
+    visible, _ = _filter(["a <", "b> <thin"])
+    assert visible == "a <b> <thin"
+
+
+def test_think_filter_drops_unclosed_think():
+    visible, think_filter = _filter(["Answer ", "<think>", "never", " closed </thi"])
+    assert visible == "Answer "
+    assert think_filter.thinking
@@ -0,0 +1,72 @@
+"""Tests of resuming event streams after a reconnect."""
+from events import EventBroker
+
+
+def _publish(broker, count, file_id=None):
+    """Publish count events and return them as a stream sees them."""
+    stream = broker.subscribe(file_id=file_id, keepalive=0)
+    assert next(stream) is None  # Starts the stream at the next event
+    events = []
+    for i in range(count):
+        broker.publish('progress', {'i': i}, file_id=file_id)
+        events.append(next(stream))
+    stream.close()
+    return events
+
+
+def test_resume_yields_the_missed_events():
+    broker = EventBroker(buffer_size=10)
+    seen = _publish(broker, 1)[-1]
+    missed = _publish(broker, 2)
+
+    stream = broker.subscribe(last_id=seen.id, keepalive=0)
+    assert [next(stream) for _ in range(2)] == missed
+    assert next(stream) is None
+    stream.close()
+
+
+def test_resume_right_before_the_oldest_buffered_event():
+    broker = EventBroker(buffer_size=2)
+    seen = _publish(broker, 1)[-1]
+    missed = _publish(broker, 2)
+
+    stream = broker.subscribe(last_id=seen.id, keepalive=0)
+    assert [next(stream) for _ in range(2)] == missed
+    stream.close()
+
+
+def test_resume_after_dropped_events_resets_then_streams():
+    broker = EventBroker(buffer_size=2)
+    seen = _publish(broker, 1)[-1]
+    latest = _publish(broker, 4)[-1]
+
+    stream = broker.subscribe(last_id=seen.id, keepalive=0)
+    reset = next(stream)
+    assert reset.type == 'reset'
+    assert reset.id == latest.id
+
+    broker.publish('status', {'status': 'completed'})
+    assert next(stream).type == 'status'
+    stream.close()
+
+
+def test_resume_from_an_unknown_future_id_resets():
+    broker = EventBroker(buffer_size=2)
+    latest = _publish(broker, 1)[-1]
+
+    stream = broker.subscribe(last_id=latest.id + 100, keepalive=0)
+    assert next(stream).type == 'reset'
+    stream.close()
+
+
+def test_file_stream_resumed_after_skipped_rows_resets():
+    broker = EventBroker()
+    seen = _publish(broker, 1, file_id=1)[-1]
+    assert not broker.publish_to_file_streams('rows', lambda: {'rows': []}, 1)
+
+    stream = broker.subscribe(last_id=seen.id, file_id=1, keepalive=0)
+    assert next(stream).type == 'reset'
+    assert broker.publish_to_file_streams('rows', lambda: {'rows': [1]}, 1)
+    assert next(stream).data == {'rows': [1]}
+    stream.close()
+    assert not broker.publish_to_file_streams('rows', lambda: {'rows': [2]}, 1)
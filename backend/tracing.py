@@ -0,0 +1,312 @@
+"""Opt-in tracing of model calls and profiling of the evaluation loop.
+
+With LLM_TRACE_ENABLED=true every classify and reason call appends one JSON
+line to LLM_TRACE_PATH with its stage, model, retry attempt, prompt and
+output token counts, time to first token, total latency and whether the
+stream was stopped early. Ollama only reports the prompt tokens at the end
+of a stream, so those of a stopped stream are counted with the model's
+tokenizer.
+
+Profiles of the evaluation loop are taken for a PROFILE_SAMPLE_RATE
+fraction of the files, or for the next file after POST /api/profile, and
+written to PROFILE_DIR in the cProfile format read by pstats, snakeviz and
+similar viewers. A profile covers the file's evaluation loop and the tasks
+that the classify and reason pools and the periodic writer flush run
+meanwhile, including those of other files evaluated at the same time.
+
+Usage:
+    python tracing.py report --limit 20 --stage reason
+"""
+import os
+import json
+import time
+import random
+import logging
+import argparse
+import pstats
+import cProfile
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+LLM_TRACE_ENABLED = os.getenv('LLM_TRACE_ENABLED', 'false').lower() == 'true'
+LLM_TRACE_PATH = os.getenv('LLM_TRACE_PATH', 'data/traces/llm_calls.jsonl')
+
+# Fraction of the evaluated files whose evaluation loop is profiled
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'data/profiles')
+
+
+class TraceStore:
+    """Append-only JSONL file of trace records, shared by every thread."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def append(self, record):
+        line = json.dumps(record) + '\n'
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line)
+            self._file.flush()
+
+
+class _CallTrace(BaseCallbackHandler):
+    """Times one model call and records it in the trace store when it ends."""
+
+    def __init__(self, store, stage, descriptions, attempt, count_tokens=None):
+        self.store = store
+        self.stage = stage
+        self.descriptions = descriptions
+        self.attempt = attempt
+        self.count_tokens = count_tokens
+        self.prompt = None
+        self.model = None
+        self.started = None
+        self.first_token = None
+        self.tokens = 0
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        params = kwargs.get('invocation_params') or {}
+        self.model = params.get('model') or params.get('_type')
+        self.prompt = prompts[0] if prompts else None
+        self.started = time.perf_counter()
+
+    def on_llm_new_token(self, token, **kwargs):
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+        self.tokens += 1
+
+    def on_llm_end(self, response, **kwargs):
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        info = (generation.generation_info if generation is not None else None) or {}
+        self._record(prompt_tokens=info.get('prompt_eval_count'), output_tokens=info.get('eval_count'),
+                     model=info.get('model'))
+
+    def on_llm_error(self, error, **kwargs):
+        if isinstance(error, GeneratorExit):
+            # The caller closed the stream once it had what it needed
+            self._record(prompt_tokens=self._count_prompt_tokens(), stopped_early=True)
+        else:
+            self._record(error=str(error))
+
+    def _count_prompt_tokens(self):
+        if self.count_tokens is None or self.prompt is None:
+            return None
+        try:
+            return self.count_tokens(self.prompt)
+        except Exception as e:
+            # Tracing never fails a call, e.g. when no tokenizer is installed
+            logger.debug(f"Could not count prompt tokens: {e}")
+            return None
+
+    def _record(self, prompt_tokens=None, output_tokens=None, model=None, error=None, stopped_early=False):
+        ended = time.perf_counter()
+        started = self.started if self.started is not None else ended
+        self.store.append({
+            'time': datetime.utcnow().isoformat(),
+            'stage': self.stage,
+            'model': model or self.model,
+            'attempt': self.attempt,
+            'descriptions': self.descriptions,
+            'prompt_tokens': prompt_tokens,
+            'output_tokens': output_tokens if output_tokens is not None else self.tokens or None,
+            'stopped_early': stopped_early,
+            'ttft_seconds': round(self.first_token - started, 4) if self.first_token is not None else None,
+            'latency_seconds': round(ended - started, 4),
+            'error': error
+        })
+
+
+class LLMTracer:
+    """Builds the callback config that traces a model call, if tracing is enabled."""
+
+    def __init__(self, path=LLM_TRACE_PATH, enabled=LLM_TRACE_ENABLED):
+        self.enabled = enabled
+        self.store = TraceStore(path)
+
+    def config(self, stage, descriptions, attempt=0, count_tokens=None):
+        """Get the config to pass to a chain's invoke.
+
+        Args:
+            stage (str): 'classify' or 'reason'
+            descriptions (list): The descriptions judged by the call
+            attempt (int): 0 for the first call, then the retry number
+            count_tokens (callable): Optional, counts the prompt tokens of a
+                stream that is stopped before the model reports them
+
+        Returns:
+            dict: A LangChain RunnableConfig, empty when tracing is disabled
+        """
+        if not self.enabled:
+            return {}
+        return {'callbacks': [_CallTrace(self.store, stage, list(descriptions), attempt, count_tokens)]}
+
+
+class LoopProfiler:
+    """Samples cProfile profiles of the evaluation loop.
+
+    cProfile only sees the thread it is enabled on, so work handed to other
+    threads is profiled per task, with task(), and added to the loop's
+    profile. Only one file is profiled at a time; a file that would be
+    sampled while another is being profiled is not.
+    """
+
+    def __init__(self, directory=PROFILE_DIR, sample_rate=PROFILE_SAMPLE_RATE):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self._requested = 0
+        self._lock = threading.Lock()
+        self._active = threading.Lock()
+        self._task_profiles = None  # Profiles of other threads' tasks while a file is profiled
+
+    def request(self, files=1):
+        """Profile the next files that start being evaluated."""
+        with self._lock:
+            self._requested += files
+            return self._requested
+
+    def _should_profile(self):
+        with self._lock:
+            if self._requested:
+                self._requested -= 1
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    @contextmanager
+    def profile(self, file_id):
+        """Profile the block if the file is sampled, writing the stats to file_<id>_<time>.prof."""
+        if not self._should_profile() or not self._active.acquire(blocking=False):
+            yield None
+            return
+        profiler = cProfile.Profile()
+        task_profiles = []
+        path = os.path.join(self.directory, f"file_{file_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.prof")
+        try:
+            self._task_profiles = task_profiles
+            profiler.enable()
+            try:
+                yield path
+            finally:
+                profiler.disable()
+                self._task_profiles = None
+            stats = pstats.Stats(profiler)
+            for task_profiler in list(task_profiles):
+                stats.add(task_profiler)
+            os.makedirs(self.directory, exist_ok=True)
+            stats.dump_stats(path)
+            logger.info(f"Wrote evaluation profile of file {file_id} to {path}")
+        finally:
+            self._active.release()
+
+    @contextmanager
+    def task(self):
+        """Profile the block if a file is being profiled, for work run on a worker thread.
+
+        Must not be used on the thread that runs the profiled evaluation loop.
+        """
+        task_profiles = self._task_profiles
+        if task_profiles is None:
+            yield
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            task_profiles.append(profiler)
+
+
+llm_tracer = LLMTracer()
+loop_profiler = LoopProfiler()
+
+
+def read_traces(path=LLM_TRACE_PATH):
+    """Read the trace records of a JSONL trace file, skipping truncated lines."""
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def _print_table(columns, rows):
+    widths = [max(len(column), *(len(str(row[i])) for row in rows)) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(value).ljust(width) for value, width in zip(row, widths)))
+
+
+def report(records, limit=20, stage=None, width=60):
+    """Print per stage and model latency percentiles, then the slowest calls."""
+    if stage:
+        records = [record for record in records if record['stage'] == stage]
+    if not records:
+        print("No traced calls")
+        return
+
+    groups = defaultdict(list)
+    for record in records:
+        groups[(record['stage'], record['model'])].append(record)
+    summary = []
+    for (call_stage, model), calls in sorted(groups.items(), key=lambda item: tuple(map(str, item[0]))):
+        latencies = [call['latency_seconds'] for call in calls]
+        ttfts = [call['ttft_seconds'] for call in calls if call['ttft_seconds'] is not None]
+        outputs = [call['output_tokens'] for call in calls if call['output_tokens'] is not None]
+        summary.append((call_stage, model, len(calls), sum(1 for call in calls if call['attempt']),
+                        round(_percentile(latencies, 0.5), 3), round(_percentile(latencies, 0.99), 3),
+                        round(_percentile(ttfts, 0.5), 3) if ttfts else '-',
+                        round(sum(outputs) / len(outputs), 1) if outputs else '-'))
+    _print_table(['stage', 'model', 'calls', 'retries', 'p50_s', 'p99_s', 'ttft_p50_s', 'avg_output_tokens'],
+                 summary)
+
+    print()
+    slowest = sorted(records, key=lambda record: record['latency_seconds'], reverse=True)[:limit]
+    rows = []
+    for record in slowest:
+        description = ' | '.join(record['descriptions'])
+        if len(description) > width:
+            description = description[:width - 3] + '...'
+        rows.append((record['latency_seconds'], record['ttft_seconds'] if record['ttft_seconds'] is not None else '-',
+                     record['stage'], record['attempt'],
+                     record['prompt_tokens'] if record['prompt_tokens'] is not None else '-',
+                     record['output_tokens'] if record['output_tokens'] is not None else '-',
+                     description))
+    _print_table(['latency_s', 'ttft_s', 'stage', 'attempt', 'prompt_tokens', 'output_tokens', 'descriptions'],
+                 rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reports on traced model calls")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    report_parser = commands.add_parser('report', help="Latency summary and slowest descriptions")
+    report_parser.add_argument('--path', default=LLM_TRACE_PATH, help="JSONL trace file")
+    report_parser.add_argument('--limit', type=int, default=20, help="Number of slowest calls listed")
+    report_parser.add_argument('--stage', choices=['classify', 'reason'], help="Only report this stage")
+
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.path):
+        parser.error(f"no trace file at {args.path}; run with LLM_TRACE_ENABLED=true first")
+    report(read_traces(args.path), args.limit, args.stage)
+
+
+if __name__ == '__main__':
+    main()
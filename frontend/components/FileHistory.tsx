@@ -23,6 +23,40 @@ interface FileHistoryProps {
   setError: React.Dispatch<React.SetStateAction<string | null>>;
 }
 
+const RESULTS_PAGE_SIZE = 100;
+
+// Fetch one page of a file's evaluated descriptions, without their reasoning
+const fetchDescriptionsPage = async (
+  fileId: number,
+  cursor: string | null = null
+) => {
+  const response = await axios.get(
+    `http://localhost:5005/api/files/${fileId}/descriptions`,
+    {
+      params: {
+        limit: RESULTS_PAGE_SIZE,
+        reasoning: false,
+        ...(cursor ? { cursor } : {}),
+      },
+    }
+  );
+  return {
+    file: response.data.file,
+    descriptions: response.data.descriptions || [],
+    nextCursor: (response.data.next_cursor as string | null) || null,
+  };
+};
+
+// Totals come from the file's counters, which cover every row of the file
+const toFileRecord = (fileId: number, file: any) => ({
+  id: fileId,
+  filename: file?.fname || "Unknown",
+  count: file?.num_processed || 0,
+  pass_count: file?.pass_count || 0,
+  fail_count: file?.fail_count || 0,
+  pass_rate: file?.pass_rate || 0,
+});
+
 const FileHistory: React.FC<FileHistoryProps> = ({
 <<<<<<< HEAD
   fileRecords,
@@ -37,6 +71,12 @@ const FileHistory: React.FC<FileHistoryProps> = ({
   setError,
 }) => {
   const [loadingFileId, setLoadingFileId] = useState<number | null>(null);
+  // The file whose results are shown, and the cursor of their next page
+  const [resultsPage, setResultsPage] = useState<{
+    fileId: number;
+    cursor: string | null;
+  } | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
 <<<<<<< HEAD
 =======
@@ -71,36 +111,13 @@ const FileHistory: React.FC<FileHistoryProps> = ({
       console.error("Error fetching file records:", error);
       setError("Failed to load file history");
 =======
-      const response = await axios.get(
-        `http://localhost:5005/api/files/${fileId}/descriptions`
+      const { file, descriptions, nextCursor } = await fetchDescriptionsPage(
+        fileId
       );
-      const { file, descriptions } = response.data;
-
-      // Set results and calculate statistics
-      if (!descriptions) {
-        throw new Error("No descriptions found for this file");
-      }
 
       setResults(descriptions);
-
-      // Calculate statistics
-      const passCount = descriptions.filter(
-        (d: any) => d.decision === "PASS"
-      ).length;
-      const failCount = descriptions.length - passCount;
-      const passRate =
-        descriptions.length > 0 ? (passCount / descriptions.length) * 100 : 0;
-
-      setFileRecords([
-        {
-          id: fileId,
-          filename: file?.filename || "Unknown",
-          count: descriptions.length,
-          pass_count: passCount,
-          fail_count: failCount,
-          pass_rate: passRate,
-        },
-      ]);
+      setResultsPage({ fileId, cursor: nextCursor });
+      setFileRecords([toFileRecord(fileId, file)]);
     } catch (error) {
       console.error("Error fetching file results:", error);
       setError("Failed to load results for this file");
@@ -126,31 +143,14 @@ const FileHistory: React.FC<FileHistoryProps> = ({
     setLoadingFileId(fileId);
     setIsLoading(true);
     try {
-      const response = await axios.get(
-        `http://localhost:5005/api/files/descriptions/${fileId}`
+      const { file, descriptions, nextCursor } = await fetchDescriptionsPage(
+        fileId
       );
-      const fileData = {
-        id: fileId,
-        filename: response.data.file?.fname || "Unknown",
-        count: response.data.descriptions?.length || 0,
-        pass_count:
-          response.data.descriptions?.filter((r: any) => r.decision === "PASS")
-            .length || 0,
-        fail_count:
-          response.data.descriptions?.filter((r: any) => r.decision === "FAIL")
-            .length || 0,
-        pass_rate:
-          response.data.descriptions?.length > 0
-            ? (response.data.descriptions.filter(
-                (r: any) => r.decision === "PASS"
-              ).length /
-                response.data.descriptions.length) *
-              100
-            : 0,
-      };
+      const fileData = toFileRecord(fileId, file);
 
-      // Update results and keep existing file records
-      setResults(response.data.descriptions || []);
+      // Show the first page of results and keep existing file records
+      setResults(descriptions);
+      setResultsPage({ fileId, cursor: nextCursor });
       setFileRecords((prevRecords) =>
         prevRecords.map((record) =>
           record.id === fileId ? { ...record, ...fileData } : record
@@ -165,6 +165,26 @@ const FileHistory: React.FC<FileHistoryProps> = ({
     }
   };
 
+  const handleLoadMore = async () => {
+    if (!resultsPage?.cursor) {
+      return;
+    }
+    setLoadingMore(true);
+    try {
+      const { descriptions, nextCursor } = await fetchDescriptionsPage(
+        resultsPage.fileId,
+        resultsPage.cursor
+      );
+      setResults((prevResults) => [...prevResults, ...descriptions]);
+      setResultsPage({ fileId: resultsPage.fileId, cursor: nextCursor });
+    } catch (error) {
+      console.error("Error fetching more results:", error);
+      setError("Failed to load more results for this file");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleDownloadResults = async (fileId: number) => {
     // Implement download logic here
   };
@@ -312,6 +332,18 @@ const FileHistory: React.FC<FileHistoryProps> = ({
 >>>>>>> ad7d3da (UI refresh with new fonts, updated dummy_llm)
         </div>
       )}
+
+      {resultsPage?.cursor && (
+        <div className="flex justify-center mt-4">
+          <button
+            onClick={handleLoadMore}
+            disabled={loadingMore}
+            className="text-primary hover:text-blue-700 text-sm"
+          >
+            {loadingMore ? "Loading..." : "Load more results"}
+          </button>
+        </div>
+      )}
     </div>
   );
 };
@@ -10,6 +10,15 @@ interface QueueItem {
   error?: string;
 }
 
+const toQueueItem = (item: any): QueueItem => ({
+  id: item.id,
+  file_name: item.file_name,
+  status: item.status,
+  progress: item.progress,
+  upload_date: item.upload_date,
+  error: item.error,
+});
+
 interface ProcessingQueueProps {
   refreshTrigger: number;
 }
@@ -20,16 +29,6 @@ const ProcessingQueue: React.FC<ProcessingQueueProps> = ({
   const [queueItems, setQueueItems] = useState<QueueItem[]>([]);
   const [loading, setLoading] = useState(false);
   const [initialLoad, setInitialLoad] = useState(true);
-  const [pollingInterval, setPollingInterval] = useState<NodeJS.Timeout | null>(
-    null
-  );
-
-  // Check if there are any active items that need polling
-  const hasActiveItems = (items: QueueItem[]) => {
-    return items.some(
-      (item) => item.status === "waiting" || item.status === "processing"
-    );
-  };
 
   // Fetch queue status
   const fetchQueueStatus = async () => {
@@ -38,23 +37,10 @@ const ProcessingQueue: React.FC<ProcessingQueueProps> = ({
       const response = await axios.get("http://localhost:5005/api/queue");
 
       // Map the queue items to our component's format
-      const queueData = response.data.queue.map((item: any) => ({
-        id: item.id,
-        file_name: item.file_name,
-        status: item.status,
-        progress: item.progress,
-        upload_date: item.upload_date,
-        error: item.error,
-      }));
+      const queueData = response.data.queue.map(toQueueItem);
 
       setQueueItems(queueData);
       setInitialLoad(false);
-
-      // Only continue polling if there are active items
-      if (pollingInterval && !hasActiveItems(queueData)) {
-        clearInterval(pollingInterval);
-        setPollingInterval(null);
-      }
     } catch (error) {
       console.error("Error fetching queue status:", error);
     } finally {
@@ -62,42 +48,44 @@ const ProcessingQueue: React.FC<ProcessingQueueProps> = ({
     }
   };
 
-  // Add a debounce function
-  const debounce = (func: Function, wait: number) => {
-    let timeout: NodeJS.Timeout;
-    return function executedFunction(...args: any[]) {
-      const later = () => {
-        clearTimeout(timeout);
-        func(...args);
-      };
-      clearTimeout(timeout);
-      timeout = setTimeout(later, wait);
-    };
-  };
-
-  // Debounced fetch function
-  const debouncedFetchQueueStatus = debounce(fetchQueueStatus, 1000);
+  // Fetch queue status on mount and when refreshTrigger changes
+  useEffect(() => {
+    fetchQueueStatus();
+  }, [refreshTrigger]);
 
-  // Fetch queue status on component mount and when refreshTrigger changes
+  // Apply pushed progress instead of polling; EventSource reconnects on its
+  // own and resumes from the last event id it received
   useEffect(() => {
-    // Add a small delay before making the first request
-    const timer = setTimeout(() => {
-      debouncedFetchQueueStatus();
-    }, 1000);
-
-    // Start polling if there are active items
-    if (hasActiveItems(queueItems)) {
-      const intervalId = setInterval(debouncedFetchQueueStatus, 10000);
-      setPollingInterval(intervalId);
-    }
+    const events = new EventSource("http://localhost:5005/api/events");
+
+    const applyUpdate = (event: MessageEvent) => {
+      const item = toQueueItem(JSON.parse(event.data));
+      setQueueItems((items) => {
+        if (item.status === "completed" || item.status === "error") {
+          return items.filter((existing) => existing.id !== item.id);
+        }
+        if (items.some((existing) => existing.id === item.id)) {
+          return items.map((existing) =>
+            existing.id === item.id ? item : existing
+          );
+        }
+        return [...items, item];
+      });
+    };
 
-    return () => {
-      if (pollingInterval) {
-        clearInterval(pollingInterval);
-      }
-      clearTimeout(timer);
+    const removeItem = (event: MessageEvent) => {
+      const { id } = JSON.parse(event.data);
+      setQueueItems((items) => items.filter((existing) => existing.id !== id));
     };
-  }, [refreshTrigger, queueItems]);
+
+    events.addEventListener("status", applyUpdate);
+    events.addEventListener("progress", applyUpdate);
+    events.addEventListener("deleted", removeItem);
+    // Events were missed while disconnected; reload the whole queue
+    events.addEventListener("reset", () => fetchQueueStatus());
+
+    return () => events.close();
+  }, []);
 
   const formatDate = (dateString: string) => {
     const date = new Date(dateString);
@@ -109,7 +97,7 @@ const ProcessingQueue: React.FC<ProcessingQueueProps> = ({
       <div className="flex justify-between items-center mb-4">
         <h3 className="text-lg font-semibold">Processing Queue</h3>
         <button
-          onClick={debouncedFetchQueueStatus}
+          onClick={fetchQueueStatus}
           className="text-primary hover:text-blue-700 text-sm"
           disabled={loading}
         >